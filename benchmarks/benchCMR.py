@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark CMR search, parsing, filtering, and result merging against a local
+cmrStandIn, so no requests go to NASA.
+
+Usage:
+    python benchmarks/benchCMR.py --sizes 10000 100000 1000000 --latency 0.05
+
+Page-number searches (serial and concurrent) stop at 30,000 granules, so
+only search-after paging covers the larger sizes.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import grimpfunc as grimp
+from grimpfunc import cmr
+from grimpfunc.cmrStandIn import cmrStandIn
+
+searchArgs = ('NSIDC-0766', '2', '2014-01-01T00:00:01Z',
+              '2030-01-01T00:23:59', None, None, '*')
+
+
+def report(name, nGranules, seconds, nPages=None):
+    ''' Print one result line '''
+    line = f'{name:32s} {nGranules:9d} granules {seconds:8.3f} s ' \
+        f'{nGranules / max(seconds, 1e-9):12.0f} granules/s'
+    if nPages:
+        line += f' {1000 * seconds / nPages:8.2f} ms/page'
+    print(line)
+
+
+def benchPagination(standIn, numWorkers):
+    ''' Time serial, concurrent, and search-after searches '''
+    for name, kwargs in [('serial pages', {}),
+                         ('concurrent pages',
+                          {'concurrent': True, 'numWorkers': numWorkers}),
+                         ('search-after pages', {'searchAfter': True})]:
+        start, requests = time.perf_counter(), standIn.requests
+        urls = grimp.get_urls(*searchArgs, **kwargs)
+        report(name, len(urls), time.perf_counter() - start,
+               standIn.requests - requests)
+
+
+def benchParse(nGranules):
+    ''' Time parsing and filtering raw pages with json.loads and with
+    incremental (ijson) parsing, with the peak memory for one page '''
+    pages = [cmrStandIn._page(i, min(i + cmr.CMR_PAGE_SIZE, nGranules))
+             for i in range(0, nGranules, cmr.CMR_PAGE_SIZE)]
+    parsers = [('json.loads + filter', json.loads)]
+    if cmr.ijson is not None:
+        parsers.append(('stream parse + filter', cmr._stream_results))
+    for name, parse in parsers:
+        start = time.perf_counter()
+        nUrls = sum(len(cmr.cmr_filter_urls(parse(x))) for x in pages)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        cmr.cmr_filter_urls(parse(pages[0]))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        report(name, nUrls, seconds, len(pages))
+        print(f'{"":32s} {peak / 2**20:9.1f} MiB peak per page')
+
+
+def benchFilter(nGranules):
+    ''' Time cmr_filter_urls on already parsed pages '''
+    pages = [json.loads(cmrStandIn._page(i, min(i + cmr.CMR_PAGE_SIZE,
+                                                nGranules)))
+             for i in range(0, nGranules, cmr.CMR_PAGE_SIZE)]
+    start = time.perf_counter()
+    unique_filenames = set()
+    nUrls = sum(len(cmr.cmr_filter_urls(x, unique_filenames=unique_filenames))
+                for x in pages)
+    report('cmr_filter_urls', nUrls, time.perf_counter() - start, len(pages))
+
+
+def benchMerge(nGranules, nSearches=10):
+    ''' Time merging search results into a cumulative cmrUrls, as findData
+    does, in nSearches steps '''
+    urls = [cmrStandIn.entry(i)['links'][0]['href'] for i in range(nGranules)]
+    myUrls = grimp.cmrUrls(mode='none')
+    myUrls.param.update(product='NSIDC-0766')
+    myUrls.setProductOptions(productFilter='all')
+    step = max(nGranules // nSearches, 1)
+    start = time.perf_counter()
+    for i in range(0, nGranules, step):
+        newUrls = urls[i:i + step]
+        myUrls.addUrls(newUrls)
+        myUrls.updateProducts(newUrls)
+    report(f'cmrUrls merge ({nSearches} searches)', myUrls.nProducts,
+           time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000],
+                        help='Numbers of granules to benchmark')
+    parser.add_argument('--latency', type=float, default=0.,
+                        help='Stand-in seconds of latency per request')
+    parser.add_argument('--errorRate', type=float, default=0.,
+                        help='Stand-in fraction of requests that fail (503)')
+    parser.add_argument('--numWorkers', type=int, default=4,
+                        help='Threads for concurrent page requests')
+    args = parser.parse_args()
+    # Measure the network path, not the local cache/index
+    cmr.cache, cmr.index, cmr.limiter = None, None, None
+    for nGranules in args.sizes:
+        print(f'\n--- {nGranules} granules ---')
+        with cmrStandIn(hits=nGranules, latency=args.latency,
+                        errorRate=args.errorRate) as standIn:
+            cmr.set_cmr_url(standIn.url)
+            benchPagination(standIn, args.numWorkers)
+            if standIn.errors:
+                print(f'{standIn.errors} injected errors retried')
+        cmr.set_cmr_url()
+        benchParse(nGranules)
+        benchFilter(nGranules)
+        benchMerge(nGranules)
+
+
+if __name__ == '__main__':
+    main()
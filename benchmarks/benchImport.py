@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the time to import grimpfunc and load its public names, each in a
+fresh interpreter.
+
+Usage:
+    python benchmarks/benchImport.py --repeats 5
+
+Run with "python -X importtime" on a single statement for a per-module
+breakdown.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Statement timed after "import grimpfunc"
+scenarios = {'import grimpfunc': '',
+             'get_urls': 'grimpfunc.get_urls',
+             'batchSearch': 'import grimpfunc.batchSearch',
+             'cmrUrls': 'grimpfunc.cmrUrls',
+             'GrIMPSubsetter': 'grimpfunc.GrIMPSubsetter',
+             'all names': 'for x in grimpfunc.__all__: getattr(grimpfunc, x)'}
+# Heavy packages reported if loaded
+heavyModules = ['pandas', 'panel', 'holoviews', 'bokeh', 'hvplot', 'geopandas',
+                'matplotlib', 'stackstac', 'rio_stac', 'pystac', 'rioxarray',
+                'xarray', 'dask']
+
+timer = '''
+import json, sys, time
+start = time.perf_counter()
+import grimpfunc
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [x for x in {heavy} if x in sys.modules]]))
+'''
+
+
+def timeScenario(statement, repeats):
+    ''' Return median seconds and heavy modules loaded for a statement '''
+    times = []
+    for i in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', timer.format(statement=statement,
+                                                heavy=heavyModules)],
+            capture_output=True, text=True, check=True).stdout
+        seconds, loaded = json.loads(output.splitlines()[-1])
+        times.append(seconds)
+    return statistics.median(times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Runs per scenario (median reported)')
+    args = parser.parse_args()
+    for name, statement in scenarios.items():
+        seconds, loaded = timeScenario(statement, args.repeats)
+        print(f'{name:20s} {seconds:8.3f} s  {", ".join(loaded) or "-"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,14 +10,28 @@ import xarray as xr
 import rioxarray
 import os
 import dask
+import dask.array
 import pandas as pd
 # from dask.diagnostics import ProgressBar
 # ProgressBar().register()
 import stackstac
 import rio_stac
 import pystac
+import numpy as np
+from affine import Affine
+from dask.base import tokenize
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from grimpfunc.cogCache import cogHeaderCache, cogReader, readHeader, \
+    bboxWindow, setProcessShare, GDAL_OPTIONS
 
 CHUNKSIZE = 512
+# Time units for outputs, float days so appended times need not match
+TIME_UNITS = 'days since 1970-01-01'
+# NSIDC can have server-side issues above about 15 connections
+MAX_PER_HOST = 12
+# Shared on-disk cache of COG headers and STAC templates
+headerCache = cogHeaderCache()
 
 productTypeDict = {'velocity': {'bands': ['vv', 'vx', 'vy'], 'template': 'vv',
                                 'index1': 4, 'index2': 5},
@@ -48,7 +62,30 @@ class GrIMPSubsetter():
     ''' Class to open remote data set and create a rioxarry. The result can
     then be cropped to create a subset, which can then be saved to a netcdf'''
 
-    def __init__(self, bands=['vv'], urls=None, tiffs=None, numWorkers=4):
+    def __init__(self, bands=['vv'], urls=None, tiffs=None, numWorkers=4,
+                 headerCache=headerCache):
+        '''
+        Parameters
+        ----------
+        bands : list of str, optional
+            Bands to load. The default is ['vv'].
+        urls, tiffs : list of str, optional
+            urls or files for the template band (e.g., vv).
+        numWorkers : int, optional
+            Dask workers. The default is 4.
+        headerCache : cogHeaderCache, optional
+            Cache of COG headers, None to always read headers from the
+            files. The default is the shared cache
+            (~/.grimp_cog_cache.sqlite), whose entries are reread after a
+            week; use cogHeaderCache(validate=True) to check each file for
+            changes instead (one HEAD request per file).
+        Returns
+        -------
+        None.
+        '''
+        self.headerCache = headerCache
+        self.gdalOptions = dict(GDAL_OPTIONS)
+        self.maxPerHost = MAX_PER_HOST
         self.urls = urls
         if tiffs is not None:
             self.urls = tiffs  # No longer seperate urls from tifs
@@ -81,6 +118,13 @@ class GrIMPSubsetter():
                                           index1=index1, index2=index2)
         # collection = first_url.split('/')[-3],
         fill_values = [self.noDataDict[band] for band in self.bands]
+        if self.headerCache is not None:
+            itemDict = self.headerCache.get(first_url, kind='stac')
+            if itemDict is not None:
+                item = pystac.Item.from_dict(itemDict)
+                self.dtype = item.assets['asset'].extra_fields[
+                    'raster:bands'][0]['data_type']
+                return item
         item = rio_stac.create_stac_item(first_url,
                                          input_datetime=date,
                                          asset_media_type=str(
@@ -94,54 +138,91 @@ class GrIMPSubsetter():
         # Remove statistics and histogram, b/c only applies to first
         item.assets['asset'].extra_fields['raster:bands'][0].pop('statistics')
         item.assets['asset'].extra_fields['raster:bands'][0].pop('histogram')
+        if self.headerCache is not None:
+            self.headerCache.put(first_url, item.to_dict(), kind='stac')
         return item
 
-    def construct_stac_items(self, URLs):
-        ''' construct STAC-style dictionaries of CMR urls for stackstac '''
-        # maintain seperate asset templates by band
-        asset_templates = {}
-        item_template = self.get_stac_item_template(URLs)
+    def _stac_templates(self, url):
+        '''
+        Read the header of url once and return the item dictionary (without
+        assets) and the asset dictionary for each band. The bands share the
+        grid of url, so only the href and nodata differ between them.
+        '''
+        itemTemplate = self.get_stac_item_template([url]).to_dict()
+        asset = itemTemplate['assets'].pop('asset')
+        assetTemplates = {}
         for band in self.bands:
-            band_template = bandsDict[band]['template']
-            url = URLs[0].replace(band_template, band)
-            asset_templates[band] = \
-                self.get_stac_item_template([url]).assets.pop('asset')
-        #
-        ITEMS = []
-        for url in URLs:
-            item = item_template.clone()
-            print('.',end='')
-            # works with single asset per item datasets (e.g. only gamma0 urls)
-            item.id = os.path.basename(url)
-            productType = bandsDict[self.bands[0]]['name']
-            index1 = productTypeDict[productType]['index1']
-            index2 = productTypeDict[productType]['index2']
-            date1, date2 = self.datesFromGrimpName(item.id, index1=index1,
-                                                   index2=index2)
-            item.datetime = date1 + (date2 - date1) * 0.5
-            for band in self.bands:
-                band_template = bandsDict[band]['template']
-                asset_template = asset_templates[band]
-                asset_template.href = url.replace(band_template, band)
-                #
-                item.add_asset(band, asset_template)
-                itemDict = item.to_dict()
-
-            ITEMS.append(itemDict)
+            assetTemplates[band] = dict(asset)
+            if 'raster:bands' in asset:
+                assetTemplates[band]['raster:bands'] = [
+                    {**asset['raster:bands'][0],
+                     'nodata': bandsDict[band]['noData']}]
+        return itemTemplate, assetTemplates
 
+    def construct_stac_items(self, URLs):
+        '''
+        construct STAC-style dictionaries of CMR urls for stackstac. Only one
+        header is read per product grid (product, version and box), and the
+        items for all urls are derived from it using vectorized file name
+        parsing. Items share the unchanged parts of their template (e.g.,
+        geometry and links), so should be treated as read only.
+        Parameters
+        ----------
+        URLs : list of str
+            urls for the template band (e.g., vv).
+        Returns
+        -------
+        list of dict
+            STAC item dictionaries.
+        '''
+        filenames = [url.rsplit('/', 1)[-1] for url in URLs]
+        # Grid: product/version directory and TSX/OPT box if any
+        grids = [(url.rsplit('/', 4)[0],
+                  name.split('_')[1] if name[0:3] in ['TSX', 'OPT'] else '')
+                 for url, name in zip(URLs, filenames)]
+        # Parse all dates at once
+        productType = bandsDict[self.bands[0]]['name']
+        index1 = productTypeDict[productType]['index1']
+        index2 = productTypeDict[productType]['index2']
+        dates1, dates2 = self.datesFromGrimpNames(filenames, index1=index1,
+                                                  index2=index2)
+        midDates = (dates1 + (dates2 - dates1) * 0.5).strftime(
+            '%Y-%m-%dT%H:%M:%SZ').tolist()
+        # Band urls from the template band urls
+        hrefs = [[url.replace(bandsDict[band]['template'], band)
+                  for url in URLs] for band in self.bands]
+        templates = {}
+        ITEMS = []
+        for i, (itemID, grid, midDate) in enumerate(
+                zip(filenames, grids, midDates)):
+            if grid not in templates:
+                templates[grid] = self._stac_templates(URLs[i])
+            itemTemplate, assetTemplates = templates[grid]
+            ITEMS.append({**itemTemplate, 'id': itemID,
+                          'properties': {**itemTemplate['properties'],
+                                         'datetime': midDate},
+                          'assets': {band: {**assetTemplates[band],
+                                            'href': bandHrefs[i]}
+                                     for band, bandHrefs in
+                                     zip(self.bands, hrefs)}})
         return ITEMS
 
-    def lazy_open_stackstac(self, items):
-        ''' return stackstac xarray dataarray '''
+    def lazy_open_stackstac(self, items, bbox=None):
+        ''' return stackstac xarray dataarray, limited to bbox if given '''
         fill_values = [self.noDataDict[band] for band in self.bands]
+        if bbox is not None:
+            bbox = (bbox['minx'], bbox['miny'], bbox['maxx'], bbox['maxy'])
         da = stackstac.stack(items,
+                             bounds=bbox,
                              fill_value=0,
                              assets=self.bands,
                              chunksize=CHUNKSIZE,
                              # NOTE: use native projection, match rioxarray
                              snap_bounds=False,  # default=True
                              xy_coords='center',  # default='topleft'
-                             dtype=self.dtype
+                             dtype=self.dtype,
+                             gdal_env=stackstac.DEFAULT_GDAL_ENV.updated(
+                                 always=self.gdalOptions)
                              )
         # da = da.rename(band='component')
         return da
@@ -166,8 +247,31 @@ class GrIMPSubsetter():
         date2 = filename.split('_')[index2]
         return pd.to_datetime(date1), pd.to_datetime(date2)
 
+    def datesFromGrimpNames(self, filenames, index1=4, index2=5):
+        '''
+        Vectorized datesFromGrimpName for a list of filenames
+        Parameters
+        ----------
+        filenames : list of str
+            product file names.
+        index1 : int, optional
+            date1 location in "_" seperated filename. The default is 4.
+        index2 : int, optional
+            date2 location in "_" seperated filename. The default is 5.
+        Returns
+        -------
+        date1, date2, pandas DatetimeIndex
+            First and second dates for each filename.
+        '''
+        parts = pd.Series(filenames, dtype=str).str.split('_')
+        # Dates are ddMonyy (e.g., 01Dec14)
+        return (pd.DatetimeIndex(pd.to_datetime(parts.str[index1],
+                                                format='%d%b%y')),
+                pd.DatetimeIndex(pd.to_datetime(parts.str[index2],
+                                                format='%d%b%y')))
+
     #@dask.delayed
-    def lazy_open(self, url, masked=True, chunkSize=512):
+    def lazy_open(self, url, masked=True, chunkSize=512, bbox=None):
         '''
         Lazy open of a single url
 
@@ -179,16 +283,19 @@ class GrIMPSubsetter():
             Masked flag to xarray The default is False.
         chunkSize : int, optional
             Chunk size. The default is 512.
+        bbox : dict, optional
+            Only open the part of the url within
+            {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}.
+            The default is None.
 
         Returns
         -------
-        TYPE
-            DESCRIPTION.
+        xarray DataArray
+            Array with bands for the url or None if it is outside bbox.
 
         '''
         # print(href)
         das = []
-        chunks = {'band': 1, 'y': chunkSize, 'x': chunkSize}
         for band in self.bands:
             productType = bandsDict[band]['name']
             template = bandsDict[band]['template']
@@ -197,17 +304,17 @@ class GrIMPSubsetter():
             index2 = productTypeDict[productType]['index2']
             date1, date2 = self.datesFromGrimpName(filename, index1=index1,
                                                    index2=index2)
-            url = url.replace(template, band)
-            if 'https' in url:
-                option = '?list_dir=no'
             # swap temnplate for other bands
-                url = f'/vsicurl/{option}&url={url}'
+            bandUrl = url.replace(template, band)
+            if 'https' in bandUrl:
+                option = '?list_dir=no'
+                bandUrl = f'/vsicurl/{option}&url={bandUrl}'
             # create rioxarry
-            da = rioxarray.open_rasterio(url, lock=True,
-                                         default_name=bandsDict[band]['name'],
-                                         chunks=chunks,
-                                         masked=masked).rename(
-                                             band='band')
+            da = self._cog_data_array(bandUrl, bandsDict[band]['name'],
+                                      masked=masked, chunkSize=chunkSize,
+                                      bbox=bbox)
+            if da is None:
+                return None
             da['band'] = [band]
             da['time'] = date1 + (date2 - date1) * 0.5
             da['time1'] = date1
@@ -219,6 +326,63 @@ class GrIMPSubsetter():
         return xr.concat(das, dim='band', join='override',
                          combine_attrs='drop')
 
+    def _cog_data_array(self, path, name, masked=True, chunkSize=512,
+                        bbox=None):
+        '''
+        Create a lazy rioxarray for one COG, or the window of it covering
+        bbox, from its (cached) header. Unlike rioxarray.open_rasterio, the
+        file is not opened until chunks are read.
+        Parameters
+        ----------
+        path : str
+            File name or GDAL path (e.g., /vsicurl/...).
+        name : str
+            Name for the data array.
+        masked : boolean, optional
+            Replace nodata with NaN. The default is True.
+        chunkSize : int, optional
+            Chunk size. The default is 512.
+        bbox : dict, optional
+            {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}, with
+            pixels selected as for rio.clip_box. The default is None.
+        Returns
+        -------
+        xarray DataArray
+            Array with dimensions band, y, x and crs/transform, or None if
+            bbox is outside the COG.
+        '''
+        options = {'gdalOptions': self.gdalOptions,
+                   'maxPerHost': self.maxPerHost}
+        if self.headerCache is not None:
+            header = self.headerCache.header(path, **options)
+        else:
+            header = readHeader(path, **options)
+        window = None
+        if bbox is not None:
+            window = bboxWindow(header, bbox)
+            if window is None:
+                return None
+        reader = cogReader(path, header, masked=masked, window=window,
+                           **options)
+        rowOff, colOff, height, width = reader.window
+        # Chunks aligned with the full COG so windows read whole blocks
+        data = dask.array.from_array(
+            reader, chunks=reader.chunks(chunkSize), lock=False,
+            name=f'cog-{tokenize(path, masked, chunkSize, reader.window)}',
+            meta=np.empty((0, 0, 0), dtype=reader.dtype))
+        # Pixel center coordinates (north up, no rotation)
+        transform = Affine(*header['transform']) * \
+            Affine.translation(colOff, rowOff)
+        x = transform.c + transform.a * (np.arange(width) + 0.5)
+        y = transform.f + transform.e * (np.arange(height) + 0.5)
+        da = xr.DataArray(data, dims=('band', 'y', 'x'), name=name,
+                          coords={'band': [1], 'y': y, 'x': x})
+        if not masked and header['nodata'] is not None:
+            da.attrs['_FillValue'] = header['nodata']
+        if header['crs'] is not None:
+            da = da.rio.write_crs(header['crs'])
+        return da.rio.write_transform(transform)
+
     def getBounds(self):
         ''' Get the bounding box for the data array '''
         bounds = [min(self.DA.x.values), min(self.DA.y.values),
@@ -238,26 +402,70 @@ class GrIMPSubsetter():
                 bands.remove(band)
         return bands
 
-    def loadStackStac(self, bands=None):
-        ''' construct dataarray with stackstac '''
+    def loadStackStac(self, bands=None, bbox=None):
+        ''' construct dataarray with stackstac, limited to
+        bbox = {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}
+        if given (which is then also the subset)'''
         self.bands = self._checkBands(bands)
         items = self.construct_stac_items(self.urls)
-        self.DA = self.lazy_open_stackstac(items)
+        self.DA = self.lazy_open_stackstac(items, bbox=bbox)
+        if bbox is not None:
+            self.subset = self.DA
 
-    def loadDataArray(self, bands=None, chunkSize=512):
-        ''' Load and concatenate arrays to create a rioxArray with coordinates
-        time, band, y, x'''
-        # NOTE: can have server-size issues w/ NSIDC if going above 15 threads
-        # if psutil.cpu_count() > 15: num_threads = 12
+    def loadDataArray(self, bands=None, chunkSize=512, numWorkers=16,
+                      maxPerHost=None, gdalOptions=None, bbox=None):
+        '''
+        Open the urls concurrently and concatenate them to create a lazy
+        rioxArray with coordinates time, band, y, x. With a bbox, only the
+        pixel window covering it is included for each url, so the graph and
+        reads scale with the bbox rather than the mosaic.
+        Parameters
+        ----------
+        bands : list of str, optional
+            Bands to load. The default is None (current bands).
+        chunkSize : int, optional
+            Chunk size. The default is 512.
+        numWorkers : int, optional
+            Number of urls to open at once. The default is 16.
+        maxPerHost : int, optional
+            Maximum concurrent connections to any one host for opening and
+            for later chunk reads (shared across processes by subSetToZarr
+            with the processes scheduler). The default is None
+            (MAX_PER_HOST).
+        gdalOptions : dict, optional
+            GDAL options to add to or override GDAL_OPTIONS (e.g.,
+            {'GDAL_HTTP_VERSION': '1.1'}). The default is None.
+        bbox : dict, optional
+            {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy}. If
+            given, the result is the same as subSetData(bbox) on the full
+            array and is also the subset. Urls outside bbox are skipped. The
+            default is None.
+        Returns
+        -------
+        None.
+        '''
         self.bands = self._checkBands(bands)
-        with dask.config.set({'scheduler': 'threads', 'num_workers': 2}):
-            # if self.urls is not None:
-            self.dataArrays = dask.compute(
-                *[self.lazy_open(url, masked=False, chunkSize=chunkSize)
-                  for url in self.urls])
+        if maxPerHost is not None:
+            self.maxPerHost = maxPerHost
+        self.gdalOptions = {**GDAL_OPTIONS, **(gdalOptions or {})}
+        with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+            self.dataArrays = list(executor.map(
+                lambda url: self.lazy_open(url, masked=False,
+                                           chunkSize=chunkSize, bbox=bbox),
+                self.urls))
+        if bbox is not None:
+            nUrls = len(self.dataArrays)
+            self.dataArrays = [x for x in self.dataArrays if x is not None]
+            if len(self.dataArrays) < nUrls:
+                print(f'Skipped {nUrls - len(self.dataArrays)} urls outside '
+                      'bbox')
+            if len(self.dataArrays) == 0:
+                raise ValueError(f'No urls intersect bbox {bbox}')
         # Concatenate along time dimensions
         self.DA = xr.concat(self.dataArrays, dim='time', join='override',
                             combine_attrs='drop')
+        if bbox is not None:
+            self.subset = self.DA
 
     def subSetData(self, bbox):
         ''' Subset dataArray with
@@ -271,9 +479,87 @@ class GrIMPSubsetter():
         self.subSetToNetCDF(cdfFile, bbox=self.getBounds(),
                             numWorkers=numWorkers)
 
-    def subSetToNetCDF(self, cdfFile, bbox=None, numWorkers=1):
+    def _dropProjCoords(self):
+        ''' Drop proj, raster and spec coordinates from subset before
+        writing it '''
+        for x in self.subset.coords:
+            if 'proj' in x or 'raster' in x or 'spec' in x:
+                self.subset = self.subset.drop(x, dim=None)
+        for x in self.subset.attrs:
+            if 'spec' in x:
+                self.subset = self.subset.drop(x, dim=None)
+
+    def _timeEncoding(self):
+        ''' Encode times as float days since 1970 so later appends with
+        other times (e.g., half days) use the same units '''
+        return {x: {'units': TIME_UNITS, 'calendar': 'proleptic_gregorian',
+                    'dtype': 'float64'}
+                for x in ['time', 'time1', 'time2'] if x in self.subset.coords}
+
+    def _newTimeSteps(self, xDS):
+        '''
+        Return the time steps of subset whose names are not in an existing
+        output, sorted by time. Only these are read when written.
+        Parameters
+        ----------
+        xDS : xarray Dataset
+            Existing output.
+        Returns
+        -------
+        new : xarray DataArray
+            New time steps of subset.
+        '''
+        for dim in ['band', 'y', 'x']:
+            if not np.array_equal(xDS[dim].values, self.subset[dim].values):
+                raise ValueError(f'Subset {dim} does not match the existing '
+                                 'output, use append=False')
+        isNew = ~np.isin(self.subset['name'].values, xDS['name'].values)
+        new = self.subset.isel(time=np.flatnonzero(isNew)).sortby('time')
+        if new.sizes['time'] > 0 and xDS.sizes['time'] > 0 and \
+                new.time.values[0] < xDS.time.values[-1]:
+            print('Warning: appending times before the last existing time')
+        print(f'Appending {new.sizes["time"]} of {self.subset.sizes["time"]}'
+              ' time steps')
+        return new
+
+    def _appendNetCDF(self, cdfFile, numWorkers):
+        ''' Append the new time steps of subset to the unlimited time
+        dimension of cdfFile in place '''
+        import netCDF4
+        with xr.open_dataset(cdfFile) as xDS:
+            new = self._newTimeSteps(xDS)
+        if new.sizes['time'] == 0:
+            return cdfFile
+        with netCDF4.Dataset(cdfFile, 'a') as ncFile:
+            if not ncFile.dimensions['time'].isunlimited():
+                raise ValueError(f'{cdfFile} time is not unlimited, use '
+                                 'append=False to rewrite it')
+            n1 = ncFile.dimensions['time'].size
+            n2 = n1 + new.sizes['time']
+            for name, variable in ncFile.variables.items():
+                if 'time' not in variable.dimensions:
+                    continue
+                source = new if name == new.name else new[name]
+                if 'since' in getattr(variable, 'units', ''):
+                    variable[n1:n2] = netCDF4.date2num(
+                        pd.to_datetime(source.values).to_pydatetime(),
+                        variable.units, variable.calendar)
+                elif variable.ndim == 1:
+                    variable[n1:n2] = source.values.astype(object)
+                else:
+                    source = source.transpose(*variable.dimensions)
+                    # One time step at a time to limit memory
+                    with dask.config.set({'scheduler': 'threads',
+                                          'num_workers': numWorkers}):
+                        for i in range(new.sizes['time']):
+                            variable[n1 + i] = source[i].values
+        return cdfFile
+
+    def subSetToNetCDF(self, cdfFile, bbox=None, numWorkers=1, append=False):
         ''' Write existing subset or update subset. Will append .nc to cdfFile
-        if not already present.
+        if not already present. Time is written as an unlimited dimension so
+        with append=True only time steps whose names are not in an existing
+        cdfFile are read and appended to it in place.
         '''
         if bbox is not None:
             self.subSetData(bbox)
@@ -282,20 +568,106 @@ class GrIMPSubsetter():
             return
         if '.nc' not in cdfFile:
             cdfFile = f'{cdfFile}.nc'
+        self._dropProjCoords()
+        if append and os.path.exists(cdfFile):
+            return self._appendNetCDF(cdfFile, numWorkers)
         if os.path.exists(cdfFile):
             os.remove(cdfFile)
-        for x in self.subset.coords:
-            if 'proj' in x or 'raster' in x or 'spec' in x:
-                self.subset = self.subset.drop(x, dim=None)
-        for x in self.subset.attrs:
-            if 'spec' in x:
-                self.subset = self.subset.drop(x, dim=None)
         # To many workers can cause a failure
         with dask.config.set({'scheduler': 'threads',
                               'num_workers': numWorkers}):
-            self.subset.to_netcdf(path=cdfFile)
+            self.subset.to_netcdf(path=cdfFile, unlimited_dims=['time'],
+                                  encoding=self._timeEncoding())
         return cdfFile
 
+    def subSetToZarr(self, zarrFile, bbox=None, numWorkers=4,
+                     scheduler='threads', append=False):
+        '''
+        Write existing subset or update subset to a Zarr store with
+        consolidated metadata. Will append .zarr to zarrFile if not already
+        present. Each Zarr chunk is one time and band and CHUNKSIZE in x and
+        y, matching the dask chunks, so chunks are written in parallel
+        without a lock. With append, only the time steps whose names are not
+        already in the store are read and appended along time.
+        Parameters
+        ----------
+        zarrFile : str
+            Zarr store (directory), which is replaced if it exists.
+        bbox : dict, optional
+            {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy} to
+            update the subset. The default is None (existing subset).
+        numWorkers : int, optional
+            Number of workers. The default is 4.
+        scheduler : str, optional
+            Dask scheduler (threads, processes, or synchronous). COG reads
+            and Zarr compression release the GIL, so threads scale with
+            cores without the process start up and transfer costs. With
+            processes, the number of processes is at most maxPerHost and
+            maxPerHost is divided among them, so the total connections per
+            host stay within maxPerHost. The default is 'threads'.
+        append : bool, optional
+            Append new time steps to an existing store rather than replacing
+            it. The default is False.
+        Returns
+        -------
+        zarrFile : str
+            Name of the Zarr store.
+        '''
+        if bbox is not None:
+            self.subSetData(bbox)
+        if self.subset is None:
+            print('No subset present - set bbox={"minxx"...}')
+            return
+        if '.zarr' not in zarrFile:
+            zarrFile = f'{zarrFile}.zarr'
+        self._dropProjCoords()
+        subset, options = self.subset, {'mode': 'w',
+                                        'encoding': self._timeEncoding()}
+        if append and os.path.exists(zarrFile):
+            with xr.open_zarr(zarrFile, consolidated=True) as xDS:
+                subset = self._newTimeSteps(xDS)
+            if subset.sizes['time'] == 0:
+                return zarrFile
+            options = {'append_dim': 'time'}
+        # Zarr needs uniform chunks, so realign window (bbox) chunks
+        chunks = {'time': 1, 'band': 1, 'y': CHUNKSIZE, 'x': CHUNKSIZE}
+        subset = subset.chunk(
+            {x: chunks[x] for x in subset.dims if x in chunks})
+        # Use the dask chunks rather than any from a file read earlier
+        subset.encoding = {}
+        config = {'scheduler': scheduler, 'num_workers': numWorkers}
+        # Per-host limits are per process, so share them across processes
+        if scheduler == 'processes' and self.maxPerHost is not None:
+            config['num_workers'] = min(numWorkers, self.maxPerHost)
+            config['multiprocessing.initializer'] = \
+                partial(setProcessShare, config['num_workers'])
+        with dask.config.set(config):
+            subset.to_zarr(zarrFile, consolidated=True, **options)
+        return zarrFile
+
+    def readFromZarr(self, zarrFile):
+        '''
+        Lazily load data from a Zarr store (e.g., from subSetToZarr)
+        Parameters
+        ----------
+        zarrFile : str
+            Zarr store.
+        Returns
+        -------
+        xDS : xarray Dataset
+            The store contents.
+        '''
+        if '.zarr' not in zarrFile:
+            zarrFile = f'{zarrFile}.zarr'
+        xDS = xr.open_zarr(zarrFile, consolidated=True)
+        # Pull the first variable that is not spatial_ref
+        for var in list(xDS.data_vars.keys()):
+            if var != 'spatial_ref':
+                self.DA = xDS[var]
+                break
+        self.subset = self.DA  # subset is whole array at this point.
+        return xDS
+
     def readFromNetCDF(self, cdfFile):
         '''
         Load data from netcdf file
@@ -1,10 +1,53 @@
-__all__ = ['boxPicker', 'cmrUrls', 'Flowlines', 'get_urls', 'GrIMPSubsetter',
-           'NASALogin', 'pointInspector']
-
-from grimpfunc.boxPicker import boxPicker
-from grimpfunc.cmrUrls import cmrUrls
-from grimpfunc.cmr import get_urls
-from grimpfunc.Flowlines import Flowlines
-from grimpfunc.GrIMPSubsetter import GrIMPSubsetter
-from grimpfunc.NASALogin import NASALogin
-from grimpfunc.pointInspector import pointInspector
+import sys
+import types
+import importlib
+
+__all__ = ['boxPicker', 'cmrUrls', 'Flowlines', 'get_granules', 'get_urls',
+           'granule_table', 'GrIMPSubsetter', 'iter_url_pages', 'iter_urls',
+           'NASALogin', 'pointInspector', 'resolve_version', 'search_many',
+           'sync_urls']
+
+# Public names and their modules. These are imported on first use, so
+# "import grimpfunc" for a CMR search does not load panel, holoviews, etc.
+_lazyNames = {'boxPicker': 'grimpfunc.boxPicker',
+              'cmrUrls': 'grimpfunc.cmrUrls',
+              'Flowlines': 'grimpfunc.Flowlines',
+              'get_granules': 'grimpfunc.cmr',
+              'get_urls': 'grimpfunc.cmr',
+              'granule_table': 'grimpfunc.cmr',
+              'GrIMPSubsetter': 'grimpfunc.GrIMPSubsetter',
+              'iter_url_pages': 'grimpfunc.cmr',
+              'iter_urls': 'grimpfunc.cmr',
+              'NASALogin': 'grimpfunc.NASALogin',
+              'pointInspector': 'grimpfunc.pointInspector',
+              'resolve_version': 'grimpfunc.cmr',
+              'search_many': 'grimpfunc.cmr',
+              'sync_urls': 'grimpfunc.cmr'}
+
+
+def __getattr__(name):
+    ''' Import public names on first access '''
+    if name not in _lazyNames:
+        raise AttributeError(f"module 'grimpfunc' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_lazyNames[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _grimpPackage(types.ModuleType):
+    ''' Importing a submodule sets it as a package attribute. For classes in
+    a module of the same name (e.g., cmrUrls), keep the class, as the eager
+    imports did, so grimpfunc.cmrUrls is always the class '''
+
+    def __setattr__(self, name, value):
+        if isinstance(value, types.ModuleType) and \
+                _lazyNames.get(name) == value.__name__:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _grimpPackage
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Command line batch search of GrIMP products from a YAML job file, writing a
+parquet manifest (see cmrManifest) of urls for each job. Uses the same
+product filtering as cmrUrls without panel/param.
+
+Example job file:
+
+defaults:
+  outputDir: manifests
+  maxAge: 86400
+jobs:
+  - name: jakobshavn6day
+    product: NSIDC-0766
+    productFilter: velocity
+    firstDate: 2020-01-01
+    lastDate: 2021-01-01
+    bbox: [-51.0, 68.5, -48.0, 70.0]
+  - name: jakobshavnTSX
+    product: NSIDC-0481
+    productFilter: speed
+    firstDate: 2015-01-01
+    lastDate: 2016-01-01
+    boxNames: [W69.10N]
+
+@author: ian
+"""
+import os
+import sys
+import argparse
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+import yaml
+from grimpfunc import cmrProducts
+from grimpfunc.cmr import get_urls
+from grimpfunc.cmrManifest import writeManifest, readManifest, \
+    manifestFresh, searchTime, requirePyarrow
+
+jobDefaults = {'productFilter': None, 'firstDate': '2000-01-01',
+               'lastDate': None, 'bbox': None, 'boxNames': None,
+               'outputDir': '.', 'maxAge': None, 'searchAfter': False}
+
+
+def readJobs(jobFile):
+    '''
+    Read a YAML job file, which is either a list of jobs or a dict with a
+    jobs list and optional defaults applied to every job.
+
+    Parameters
+    ----------
+    jobFile : str
+        YAML file name.
+    Returns
+    -------
+    jobs : list of dict
+        Jobs with defaults filled in.
+    '''
+    with open(jobFile) as fpIn:
+        jobSpec = yaml.safe_load(fpIn)
+    defaults = {}
+    if isinstance(jobSpec, dict):
+        defaults = jobSpec.get('defaults', {}) or {}
+        jobSpec = jobSpec.get('jobs', [])
+    jobs = []
+    for i, job in enumerate(jobSpec):
+        job = {**jobDefaults, **defaults, **job}
+        if job.get('product') not in cmrProducts.products:
+            raise ValueError(f'Job {i}: invalid product {job.get("product")}')
+        options = cmrProducts.productOptions[job['product']]
+        if job['productFilter'] is None:
+            job['productFilter'] = options[0]
+        if job['productFilter'] not in options:
+            raise ValueError(f'Job {i}: invalid productFilter '
+                             f'{job["productFilter"]}, use one of {options}')
+        job.setdefault('name', f'{job["product"]}_{job["productFilter"]}_{i}')
+        if job['lastDate'] is None:
+            job['lastDate'] = date.today()
+        jobs.append(job)
+    return jobs
+
+
+def _jobBounds(job):
+    ''' Return the {'LatMin', ...} bounds for a job from its bbox '''
+    if job['bbox'] is None:
+        return dict(cmrProducts.defaultBounds)
+    lonMin, latMin, lonMax, latMax = [float(x) for x in job['bbox']]
+    return {'LatMin': latMin, 'LatMax': latMax, 'LonMin': lonMin,
+            'LonMax': lonMax}
+
+
+def manifestFile(job):
+    ''' Manifest file name for a job '''
+    return os.path.join(job['outputDir'], f'{job["name"]}.parquet')
+
+
+def runJob(job, verbose=False):
+    '''
+    Run the searches for a job and write its manifest. If the job has
+    boxNames, each box is searched separately (NSIDC-0481/0646).
+
+    Parameters
+    ----------
+    job : dict
+        Job from readJobs.
+    verbose : bool, optional
+        Print search urls. The default is False.
+    Returns
+    -------
+    nUrls : int
+        Number of urls in the manifest.
+    '''
+    outFile = manifestFile(job)
+    if job['maxAge'] is not None and os.path.exists(outFile):
+        urls, dates, metadata = readManifest(outFile)
+        if manifestFresh(metadata, job['maxAge']):
+            print(f'{job["name"]}: {outFile} is current, skipping')
+            return len(urls)
+    bounds = _jobBounds(job)
+    boundingBox = cmrProducts.boundingBoxString(bounds)
+    # One search for each box or a single search for the product filter
+    boxNames = job['boxNames'] or [None]
+    urls, searches = set(), []
+    for boxName in boxNames:
+        params = cmrProducts.searchParams(
+            job['product'], boxName or job['productFilter'], job['firstDate'],
+            job['lastDate'], boundingBox, boxNames=boxName is not None)
+        keys = ['short_name', 'version', 'time_start', 'time_end',
+                'bounding_box', 'polygon', 'filename_filter']
+        search = {**dict(zip(keys, params)),
+                  'productFilter': job['productFilter'],
+                  'searchTime': searchTime(), 'complete': False}
+        allUrls = get_urls(*params, verbose=verbose,
+                           searchAfter=job['searchAfter'])
+        urls.update(cmrProducts.filterUrls(allUrls, job['productFilter']))
+        search['complete'] = True
+        searches.append(search)
+    urls = sorted(urls)
+    # Date for the first url of each product, as for cmrUrls
+    firstUrls = {}
+    for url in urls:
+        firstUrls.setdefault(url.split('/')[-1], url)
+    names, productDates = cmrProducts.productDates(urls, job['productFilter'])
+    dates = {}
+    for name, productDate in zip(names, productDates):
+        dates.setdefault(firstUrls[name], productDate)
+    state = {'product': job['product'], 'productFilter': job['productFilter'],
+             'firstDate': _dateString(job['firstDate']),
+             'lastDate': _dateString(job['lastDate']), 'bounds': bounds}
+    os.makedirs(job['outputDir'], exist_ok=True)
+    writeManifest(outFile, urls, {'job': job['name'], 'state': state,
+                                  'searches': searches}, dates=dates)
+    print(f'{job["name"]}: {len(urls)} urls written to {outFile}')
+    return len(urls)
+
+
+def _dateString(myDate):
+    ''' Date as YYYY-MM-DD '''
+    if isinstance(myDate, (date, datetime)):
+        return myDate.strftime('%Y-%m-%d')
+    return str(myDate)
+
+
+def runJobs(jobs, numWorkers=4, verbose=False):
+    '''
+    Run jobs concurrently. A failed job is reported without stopping the
+    others.
+
+    Parameters
+    ----------
+    jobs : list of dict
+        Jobs from readJobs.
+    numWorkers : int, optional
+        Number of jobs to run at once. The default is 4.
+    verbose : bool, optional
+        Print search urls. The default is False.
+    Returns
+    -------
+    results : dict
+        {job name: number of urls, or the exception for failed jobs}.
+    '''
+    # Fail before searching if manifests can't be written
+    requirePyarrow()
+    results = {}
+    with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+        futures = {job['name']: executor.submit(runJob, job, verbose=verbose)
+                   for job in jobs}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f'{name}: failed ({e})')
+                results[name] = e
+    return results
+
+
+def main(argv=None):
+    ''' Command line entry point, returns 1 if any job failed '''
+    parser = argparse.ArgumentParser(
+        description='Search NSIDC for GrIMP products listed in a YAML job '
+        'file and write a parquet url manifest for each job')
+    parser.add_argument('jobFile', help='YAML job file')
+    parser.add_argument('--numWorkers', type=int, default=4,
+                        help='Jobs to run at once [4]')
+    parser.add_argument('--outputDir', default=None,
+                        help='Override the output directory for all jobs')
+    parser.add_argument('--force', action='store_true',
+                        help='Search even if a manifest is current')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print search urls')
+    args = parser.parse_args(argv)
+    jobs = readJobs(args.jobFile)
+    for job in jobs:
+        if args.outputDir is not None:
+            job['outputDir'] = args.outputDir
+        if args.force:
+            job['maxAge'] = None
+    results = runJobs(jobs, numWorkers=args.numWorkers, verbose=args.verbose)
+    return int(any(isinstance(x, Exception) for x in results.values()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
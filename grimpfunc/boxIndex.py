@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local spatial index of the TSX/optical glacier box footprints for NSIDC-0481
+and NSIDC-0646, so the boxes for an area or flowline are found without
+searching CMR.
+
+@author: ian
+"""
+import time
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from pyproj import Transformer
+from grimpfunc import cmr
+from grimpfunc.cmrProducts import versions
+from grimpfunc.granuleIndex import entryBounds, _parseBoundingBox
+from grimpfunc.sqliteStore import sqliteStore
+
+# Products with box names
+boxProducts = ['NSIDC-0481', 'NSIDC-0646']
+# Start of the box products
+boxFirstDate = '2009-01-01T00:00:01Z'
+
+
+class boxIndex(sqliteStore):
+    ''' SQLite index (with an R-tree) of the footprint of each glacier box,
+    computed as the union of the footprints of the box's granules. The
+    footprints for a product are refreshed from CMR when older than
+    maxAge.'''
+
+    tables = {'boxes': 'CREATE TABLE IF NOT EXISTS boxes (id INTEGER PRIMARY '
+              'KEY, product TEXT, box TEXT, nGranules INTEGER)',
+              'boxFootprints': 'CREATE VIRTUAL TABLE IF NOT EXISTS '
+              'boxFootprints USING rtree(id, minLon, maxLon, minLat, '
+              'maxLat)',
+              'refreshes': 'CREATE TABLE IF NOT EXISTS refreshes (product '
+              'TEXT PRIMARY KEY, version TEXT, updated REAL)'}
+
+    def __init__(self, indexFile='~/.grimp_box_index.sqlite',
+                 maxAge=30 * 86400):
+        '''
+        Parameters
+        ----------
+        indexFile : str, optional
+            SQLite file for the index. The default is
+            '~/.grimp_box_index.sqlite'.
+        maxAge : float, optional
+            Age in seconds after which footprints are refreshed from CMR.
+            The default is 30 days.
+        Returns
+        -------
+        None.
+        '''
+        super().__init__(indexFile)
+        self.maxAge = maxAge
+        self._refreshLock = threading.Lock()
+
+    def stale(self, product):
+        ''' Return True if the product footprints are missing or older than
+        maxAge '''
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT updated FROM refreshes WHERE product = ?',
+                (product,)).fetchone()
+        return row is None or time.time() - row[0] > self.maxAge
+
+    def refresh(self, product, verbose=False):
+        '''
+        Replace the box footprints for a product with the union of its
+        granule footprints from a full CMR search.
+
+        Parameters
+        ----------
+        product : str
+            NSIDC-0481 or NSIDC-0646.
+        verbose : bool, optional
+            Print search urls. The default is False.
+        Returns
+        -------
+        nBoxes : int
+            Number of boxes found.
+        '''
+        if product not in boxProducts:
+            raise ValueError(f'{product} does not have boxes, use one of '
+                             f'{boxProducts}')
+        version = cmr.resolve_version(product, versions[product])
+        timeEnd = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        entryUrls = []
+        # Search after paging so all granules are included
+        for search_results in cmr._search_pages(
+                product, version, boxFirstDate, timeEnd, None, None, '*',
+                verbose=verbose, searchAfter=True):
+            entryUrls += cmr.cmr_filter_entries(search_results)
+        granules = cmr.granule_table([url for _, url in entryUrls])
+        footprints = {}
+        for (entry, _), box in zip(entryUrls, granules['box']):
+            if not box:
+                continue
+            lonMin, latMin, lonMax, latMax = entryBounds(entry)
+            if box not in footprints:
+                footprints[box] = [lonMin, latMin, lonMax, latMax, set()]
+            bounds = footprints[box]
+            bounds[:4] = [min(bounds[0], lonMin), min(bounds[1], latMin),
+                          max(bounds[2], lonMax), max(bounds[3], latMax)]
+            # Granules have a link for each band, so count entries once
+            bounds[4].add(entry.get('id', entry.get('producer_granule_id')))
+        with self._transaction() as connection:
+            ids = [x[0] for x in connection.execute(
+                'SELECT id FROM boxes WHERE product = ?', (product,))]
+            connection.executemany('DELETE FROM boxFootprints WHERE id = ?',
+                                   [(x,) for x in ids])
+            connection.execute('DELETE FROM boxes WHERE product = ?',
+                               (product,))
+            for box, (lonMin, latMin, lonMax, latMax, entryIDs) in \
+                    sorted(footprints.items()):
+                cursor = connection.execute(
+                    'INSERT INTO boxes (product, box, nGranules) '
+                    'VALUES (?, ?, ?)', (product, box, len(entryIDs)))
+                connection.execute(
+                    'INSERT INTO boxFootprints VALUES (?, ?, ?, ?, ?)',
+                    (cursor.lastrowid, lonMin, lonMax, latMin, latMax))
+            connection.execute(
+                'INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?)',
+                (product, str(version), time.time()))
+        return len(footprints)
+
+    def _update(self, product, refresh):
+        ''' Refresh if requested (True) or stale (None) '''
+        # Only one thread refreshes a product at a time
+        with self._refreshLock:
+            if refresh or (refresh is None and self.stale(product)):
+                self.refresh(product)
+
+    def footprints(self, product, refresh=None):
+        '''
+        Return the footprint of each box.
+
+        Parameters
+        ----------
+        product : str
+            NSIDC-0481 or NSIDC-0646.
+        refresh : bool, optional
+            True to refresh from CMR, False to use the index as is. The
+            default is None (refresh if stale).
+        Returns
+        -------
+        footprints : dict
+            {box: (lonmin, latmin, lonmax, latmax)}.
+        '''
+        self._update(product, refresh)
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT b.box, f.minLon, f.minLat, f.maxLon, f.maxLat FROM '
+                'boxes b JOIN boxFootprints f ON b.id = f.id WHERE '
+                'b.product = ? ORDER BY b.box', (product,)).fetchall()
+        return {x[0]: tuple(x[1:]) for x in rows}
+
+    def intersecting(self, product, bounding_box=None, refresh=None):
+        '''
+        Return the sorted names of the boxes whose footprints intersect an
+        area.
+
+        Parameters
+        ----------
+        product : str
+            NSIDC-0481 or NSIDC-0646.
+        bounding_box : str or tuple, optional
+            "lonmin,latmin,lonmax,latmax" or (lonmin, latmin, lonmax,
+            latmax). The default is None (all boxes).
+        refresh : bool, optional
+            True to refresh from CMR, False to use the index as is. The
+            default is None (refresh if stale).
+        Returns
+        -------
+        boxes : list of str
+        '''
+        self._update(product, refresh)
+        if bounding_box is None or isinstance(bounding_box, str):
+            bounding_box = _parseBoundingBox(bounding_box)
+        lonMin, latMin, lonMax, latMax = bounding_box
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT b.box FROM boxes b JOIN boxFootprints f ON b.id = f.id '
+                'WHERE b.product = ? AND f.maxLon >= ? AND f.minLon <= ? AND '
+                'f.maxLat >= ? AND f.minLat <= ? ORDER BY b.box',
+                (product, lonMin, lonMax, latMin, latMax)).fetchall()
+        return [x[0] for x in rows]
+
+    def alongFlowline(self, product, x, y, epsg=3413, refresh=None):
+        '''
+        Return the sorted names of the boxes that contain any point of a
+        flowline (e.g., from Flowlines.xy()).
+
+        Parameters
+        ----------
+        product : str
+            NSIDC-0481 or NSIDC-0646.
+        x, y : array
+            Flowline coordinates in m.
+        epsg : int, optional
+            EPSG code for x, y. The default is 3413.
+        refresh : bool, optional
+            True to refresh from CMR, False to use the index as is. The
+            default is None (refresh if stale).
+        Returns
+        -------
+        boxes : list of str
+        '''
+        transformer = Transformer.from_crs(epsg, 4326, always_xy=True)
+        lon, lat = transformer.transform(np.asarray(x, dtype=float),
+                                         np.asarray(y, dtype=float))
+        # Candidates from flowline extent, then check the points
+        candidates = self.intersecting(
+            product, (lon.min(), lat.min(), lon.max(), lat.max()),
+            refresh=refresh)
+        footprints = self.footprints(product, refresh=False)
+        boxes = []
+        for box in candidates:
+            lonMin, latMin, lonMax, latMax = footprints[box]
+            if np.any((lon >= lonMin) & (lon <= lonMax) &
+                      (lat >= latMin) & (lat <= latMax)):
+                boxes.append(box)
+        return boxes
+
+
+# Shared index used by cmrUrls
+glacierBoxes = boxIndex()
@@ -60,15 +60,14 @@ class boxPicker():
 
     def _getDefaultMap(self):
         ''' Get the latest version of a in image map '''
-        version = 4
-        # Increment version if not found
-        for i in range(0, 5):
-            urls = grimp.get_urls('NSIDC-0723', str(int(version) + i),
-                                  '2020-01-01T00:00:01Z',
-                                  '2020-01-05T00:23:59',
-                                  None, None, '*image*')
-            if len(urls) > 0:
-                return list(filter(lambda x: '.tif' in x, urls))[0]
+        # Later version used if not found
+        version = grimp.resolve_version('NSIDC-0723', 4)
+        urls = grimp.get_urls('NSIDC-0723', version,
+                              '2020-01-01T00:00:01Z',
+                              '2020-01-05T00:23:59',
+                              None, None, '*image*')
+        if len(urls) > 0:
+            return list(filter(lambda x: '.tif' in x, urls))[0]
         print('Warning could not find default map')
 
     def plotMap(self, show=True):
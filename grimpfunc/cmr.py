@@ -6,31 +6,125 @@ Simplified version of NSIDC Download Script to return links without downloading
 created by Scott Henderson
 '''
 
+import io
+import json
 import requests
-import itertools
+from urllib3.util.retry import Retry
+import math
+import time
+import sqlite3
+import threading
+from functools import partial
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from grimpfunc.cmrCache import cmrCache
+from grimpfunc.cmrCatalog import cmrCatalog
+from grimpfunc.granuleIndex import granuleIndex, bandPattern
+try:
+    import ijson
+    jsonErrors = (ValueError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    jsonErrors = (ValueError,)
 
 CMR_URL = 'https://cmr.earthdata.nasa.gov'
 URS_URL = 'https://urs.earthdata.nasa.gov'
 CMR_PAGE_SIZE = 2000
-CMR_FILE_URL = (f'{CMR_URL}/search/granules.json?provider=NSIDC_CPRD'
-                f'&sort_key[]=start_date&sort_key[]=producer_granule_id'
-                f'&scroll=false&page_size={CMR_PAGE_SIZE}')
+CMR_MAX_PAGES = 15
+# Parse search pages incrementally (needs ijson), keeping only the entry
+# fields and data links used here. This bounds memory per page for large
+# searches, but takes more CPU than json.loads, so it is off by default.
+CMR_STREAM = False
+streamFields = ['id', 'producer_granule_id', 'time_start', 'time_end',
+                'boxes', 'polygons']
 
 
-def cmr_filter_urls(search_results):
-    """Select only the desired data files from CMR response."""
-    if 'feed' not in search_results or 'entry' not in search_results['feed']:
-        return []
+def _search_urls(cmrUrl):
+    ''' Granule and collection search urls for a CMR '''
+    return (f'{cmrUrl}/search/granules.json?provider=NSIDC_CPRD'
+            f'&sort_key[]=start_date&sort_key[]=producer_granule_id'
+            f'&scroll=false&page_size={CMR_PAGE_SIZE}',
+            f'{cmrUrl}/search/collections.json'
+            '?provider=NSIDC_CPRD&has_granules=true')
 
-    entries = [e['links']
-               for e in search_results['feed']['entry']
-               if 'links' in e]
-    # Flatten "entries" to a simple list of links
-    links = list(itertools.chain(*entries))
-    # print(len(links))
-    urls = []
-    unique_filenames = set()
-    for link in links:
+
+CMR_FILE_URL, CMR_COLLECTION_URL = _search_urls(CMR_URL)
+# Seconds before a resolved product version is checked again
+VERSION_TTL = 3600
+# Resolved versions {(cmr, short_name, version): (resolvedVersion, expiry)}
+_versions = {}
+# Connections kept open to CMR, shared by all threads
+CMR_POOL_SIZE = 16
+# Retries with exponential backoff (0.5, 1, 2, 4... s) on throttling/errors
+CMR_MAX_RETRIES = 5
+CMR_BACKOFF = 0.5
+CMR_RETRY_STATUS = [429, 500, 502, 503, 504]
+CMR_TIMEOUT = 120
+_session = None
+_sessionLock = threading.Lock()
+# Cache for CMR responses, set to None to disable or replace with a cmrCache
+# with different ttl/size.
+cache = cmrCache()
+# Stores that failed (e.g., no writable home), warned about once
+_storeWarnings = set()
+# Index of granules from completed searches, used to answer searches within
+# an area/date range already searched. Set to None to disable.
+index = granuleIndex()
+
+
+class rateLimiter():
+    ''' Space out requests so that no more than rate start per second,
+    across all threads '''
+
+    def __init__(self, rate=10):
+        self.rate = rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        ''' Wait for the next free request slot '''
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + 1. / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Client side limit on requests to CMR, change limiter.rate or set to None
+limiter = rateLimiter()
+
+
+def _store_failed(store, error):
+    ''' Warn once that an on-disk cache/index can't be used. Searches then go
+    to CMR, so a broken store only costs speed. '''
+    name = type(store).__name__
+    if name not in _storeWarnings:
+        _storeWarnings.add(name)
+        print(f'Warning: {name} unavailable ({error}), searching CMR '
+              'without it')
+
+
+def set_cmr_url(cmrUrl='https://cmr.earthdata.nasa.gov'):
+    ''' Send searches to a different CMR, e.g., a cmrStandIn for testing.
+    The default restores the NASA CMR.'''
+    global CMR_URL, CMR_FILE_URL, CMR_COLLECTION_URL
+    CMR_URL = cmrUrl
+    CMR_FILE_URL, CMR_COLLECTION_URL = _search_urls(cmrUrl)
+
+
+def cmr_endpoint():
+    ''' Host of the current CMR, which keys the version memo and granule
+    index so results from one CMR are not used for another '''
+    return urlsplit(CMR_URL).netloc
+
+
+def _entry_links(entry):
+    """Select the data links for one CMR entry."""
+    for link in entry.get('links', []):
         if 'href' not in link:
             # Exclude links with nothing to download
             continue
@@ -47,29 +141,137 @@ def cmr_filter_urls(search_results):
             # This is a hack; when the metadata is updated to properly identify
             # non-datapool links, we should be possible in a non-hack way
             continue
+        yield link['href']
+
+
+def cmr_filter_entries(search_results, unique_filenames=None):
+    """Select only the desired data files from CMR response, returning
+    (entry, url) pairs so the granule metadata stays with each url. Pass a
+    set as unique_filenames to carry the duplicate filename check across
+    pages."""
+    if 'feed' not in search_results or 'entry' not in search_results['feed']:
+        return []
+    entryUrls = []
+    if unique_filenames is None:
+        unique_filenames = set()
+    for entry in search_results['feed']['entry']:
+        for url in _entry_links(entry):
+            filename = url.split('/')[-1]
+            if filename in unique_filenames:
+                # Exclude links with duplicate filenames (they would
+                # overwrite)
+                continue
+            unique_filenames.add(filename)
+            entryUrls.append((entry, url))
+    return entryUrls
+
+
+def cmr_filter_urls(search_results, unique_filenames=None):
+    """Select only the desired data files from CMR response. Pass a set as
+    unique_filenames to carry the duplicate filename check across pages."""
+    return [url for _, url in cmr_filter_entries(
+        search_results, unique_filenames=unique_filenames)]
 
-        filename = link['href'].split('/')[-1]
-        if filename in unique_filenames:
-            # Exclude links with duplicate filenames (they would overwrite)
-            continue
-        unique_filenames.add(filename)
 
-        urls.append(link['href'])
+def _get_session():
+    ''' Return the shared session, so connections are reused across
+    queries and threads, and failed requests are retried '''
+    global _session
+    with _sessionLock:
+        if _session is None:
+            _session = requests.Session()
+            retries = Retry(total=CMR_MAX_RETRIES, backoff_factor=CMR_BACKOFF,
+                            status_forcelist=CMR_RETRY_STATUS,
+                            allowed_methods=['GET'],
+                            respect_retry_after_header=True,
+                            raise_on_status=False)
+            adapter = requests.adapters.HTTPAdapter(
+                pool_maxsize=CMR_POOL_SIZE, max_retries=retries)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+    return _session
 
-    return urls
 
+def _stream_results(content):
+    ''' Parse a granule search incrementally from bytes or a file object,
+    keeping only streamFields and the data links for each entry, so the full
+    page is never held as python objects '''
+    if isinstance(content, bytes):
+        content = io.BytesIO(content)
+    entries = []
+    for entry in ijson.items(content, 'feed.entry.item', use_float=True):
+        slimEntry = {x: entry[x] for x in streamFields if x in entry}
+        slimEntry['links'] = [{'href': x} for x in _entry_links(entry)]
+        entries.append(slimEntry)
+    return {'feed': {'entry': entries}}
 
-def query_cmr(query_url):
-    ''' return JSON / python dictionary'''
+
+def _query_cmr_page(query_url, search_after=None, useCache=True,
+                    stream=False):
+    ''' return JSON / python dictionary and the response headers. If
+    search_after is given, it is passed as the CMR-Search-After header to
+    request the page following the one that returned it. Responses are
+    read from/saved to the cache unless useCache is False. If stream, granule
+    pages are parsed incrementally with only the fields used here.'''
+    stream = stream and ijson is not None
+    parse = _stream_results if stream else json.loads
+    useCache = useCache and cache is not None
+    if useCache:
+        try:
+            cached = cache.get(query_url, search_after=search_after,
+                               parse=parse)
+        except sqlite3.Error as e:
+            _store_failed(cache, e)
+            cached = None
+        if cached is not None:
+            return cached
+    headers = {}
+    if search_after is not None:
+        headers['CMR-Search-After'] = search_after
+    if limiter is not None:
+        limiter.wait()
+    # Without the cache, stream directly from the connection
+    response = _get_session().get(query_url, headers=headers,
+                                  timeout=CMR_TIMEOUT,
+                                  stream=stream and not useCache)
+    # Error after retries
+    response.raise_for_status()
+    try:
+        if stream and not useCache:
+            response.raw.decode_content = True
+            search_results = _stream_results(response.raw)
+        else:
+            search_results = parse(response.content)
+    except jsonErrors:
+        raise ValueError(f'Invalid JSON from CMR for {query_url}')
+    if 'feed' not in search_results:
+        raise ValueError(f'Unexpected CMR response for {query_url}: '
+                         f'{search_results.get("errors", search_results)}')
+    if useCache:
+        try:
+            cache.put(query_url, response.content, response.headers,
+                      search_after=search_after)
+        except sqlite3.Error as e:
+            _store_failed(cache, e)
+    return search_results, response.headers
+
+
+def query_cmr(query_url, return_hits=False, useCache=True, stream=False):
+    ''' return JSON / python dictionary, and if return_hits, the total number
+    of granules matching the search (CMR-Hits header). If stream, the page
+    is parsed incrementally and only the entry fields used by grimpfunc
+    (streamFields and data links) are returned.'''
     # print(query_url)
-    response = requests.get(query_url)
-    search_results = response.json()
+    search_results, headers = _query_cmr_page(query_url, useCache=useCache,
+                                              stream=stream)
+    if return_hits:
+        return search_results, int(headers.get('CMR-Hits', 0))
     return search_results
 
 
 def build_cmr_query_url(short_name, version, time_start, time_end, page,
                         bounding_box=None, polygon=None,
-                        filename_filter=None):
+                        filename_filter=None, revision_date=None):
     params = f'&short_name={short_name}'
     params += f'&version={version}'
     params += f'&temporal[]={time_start},{time_end}'
@@ -80,23 +282,351 @@ def build_cmr_query_url(short_name, version, time_start, time_end, page,
     if filename_filter:
         option = '&options[producer_granule_id][pattern]=true'
         params += f'&producer_granule_id[]={filename_filter}{option}'
-    # Return search string
+    if revision_date:
+        # Only granules created or revised since revision_date
+        params += f'&revision_date[]={revision_date},'
+    # Return search string (page=None for search-after paging)
+    if page is None:
+        return CMR_FILE_URL + params
     return CMR_FILE_URL + f'&page_num={page}' + params
 
 
-def get_urls(short_name, version, time_start, time_end, bounding_box, polygon,
-             filename_filter, verbose=False):
-    urls = []
-    # Loop over pages - this should allow 30,000 returns 15*2000
-    for page in range(1, 16):
-        query_url = build_cmr_query_url(short_name, version, time_start,
-                                        time_end, page,
-                                        bounding_box, polygon, filename_filter)
+def _query_pages(query_url, verbose=False, useCache=True):
+    ''' Query pages one after another until a page is not full '''
+    for page in range(1, CMR_MAX_PAGES + 1):
         if verbose:
-            print(query_url)
-        search_results = query_cmr(query_url)
-        # print(search_results)
-        urls += cmr_filter_urls(search_results)
+            print(query_url(page))
+        search_results = query_cmr(query_url(page), useCache=useCache,
+                                   stream=CMR_STREAM)
+        yield search_results
         # Page not full so done
         if len(search_results['feed']['entry']) < CMR_PAGE_SIZE:
-            return [str(x) for x in urls]
+            return
+
+
+def _query_pages_concurrent(query_url, verbose=False, numWorkers=4,
+                            useCache=True):
+    ''' Query the first page to get the hit count, then query the remaining
+    pages in parallel. Pages are returned in page order.'''
+    if verbose:
+        print(query_url(1))
+    search_results, hits = query_cmr(query_url(1), return_hits=True,
+                                     useCache=useCache, stream=CMR_STREAM)
+    nPages = min(math.ceil(hits / CMR_PAGE_SIZE), CMR_MAX_PAGES)
+    pageUrls = [query_url(page) for page in range(2, nPages + 1)]
+    if verbose:
+        print(*pageUrls, sep='\n')
+    with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+        # map preserves order, so results stay sorted as in the serial case
+        return [search_results] + list(
+            executor.map(partial(query_cmr, useCache=useCache,
+                                 stream=CMR_STREAM), pageUrls))
+
+
+def _query_pages_search_after(query_url, verbose=False, useCache=True):
+    ''' Query pages with CMR-Search-After, which has no page limit and
+    constant cost per page, until a page is not full '''
+    search_after = None
+    while True:
+        if verbose:
+            print(query_url(None), search_after)
+        search_results, headers = _query_cmr_page(query_url(None),
+                                                  search_after=search_after,
+                                                  useCache=useCache,
+                                                  stream=CMR_STREAM)
+        yield search_results
+        search_after = headers.get('CMR-Search-After')
+        # Page not full or no further pages so done
+        if len(search_results['feed']['entry']) < CMR_PAGE_SIZE or \
+                search_after is None:
+            return
+
+
+def resolve_version(short_name, version, nVersions=5, useCache=True):
+    '''
+    Return the current version of a product. The collection metadata for
+    version, version+1, ... (nVersions in all) are checked in parallel, and
+    the first version with granules is returned. Results are kept for
+    VERSION_TTL seconds.
+
+    Parameters
+    ----------
+    short_name : str
+        Product name (e.g., NSIDC-0725).
+    version : str or int
+        Oldest version to consider.
+    nVersions : int, optional
+        Number of versions to check. The default is 5.
+    useCache : bool, optional
+        Use previously resolved versions and the response cache. The
+        default is True.
+    Returns
+    -------
+    version : str
+        Current version, or version if none are found.
+    '''
+    key = (cmr_endpoint(), short_name, str(version))
+    if useCache and key in _versions and _versions[key][1] > time.time():
+        return _versions[key][0]
+    candidates = [str(int(version) + i) for i in range(0, nVersions)]
+    queryUrls = [f'{CMR_COLLECTION_URL}&short_name={short_name}'
+                 f'&version={x}' for x in candidates]
+    with ThreadPoolExecutor(max_workers=nVersions) as executor:
+        results = list(executor.map(partial(query_cmr, useCache=useCache),
+                                    queryUrls))
+    resolved = str(version)
+    for candidate, search_results in zip(candidates, results):
+        if len(search_results.get('feed', {}).get('entry', [])) > 0:
+            resolved = candidate
+            break
+    else:
+        # Nothing found so don't keep
+        return resolved
+    _versions[key] = (resolved, time.time() + VERSION_TTL)
+    return resolved
+
+
+def _search_pages(short_name, version, time_start, time_end, bounding_box,
+                  polygon, filename_filter, verbose=False, concurrent=False,
+                  numWorkers=4, searchAfter=False, useCache=True,
+                  revision_date=None):
+    ''' Return an iterable of the result pages for a search '''
+    def query_url(page):
+        return build_cmr_query_url(short_name, version, time_start, time_end,
+                                   page, bounding_box, polygon,
+                                   filename_filter,
+                                   revision_date=revision_date)
+    # Loop over pages - this should allow 30,000 returns 15*2000
+    if searchAfter:
+        return _query_pages_search_after(query_url, verbose=verbose,
+                                         useCache=useCache)
+    if concurrent:
+        return _query_pages_concurrent(query_url, verbose=verbose,
+                                       numWorkers=numWorkers,
+                                       useCache=useCache)
+    return _query_pages(query_url, verbose=verbose, useCache=useCache)
+
+
+def get_urls(short_name, version, time_start, time_end, bounding_box, polygon,
+             filename_filter, verbose=False, concurrent=False, numWorkers=4,
+             searchAfter=False, useCache=True):
+    '''
+    Return the urls for the granules matching a search
+
+    Parameters
+    ----------
+    short_name : str
+        Product name (e.g., NSIDC-0725).
+    version : str
+        Product version.
+    time_start, time_end : str
+        Temporal range for the search (e.g., 2020-01-01T00:00:01Z).
+    bounding_box : str
+        lonmin,latmin,lonmax,latmax or None.
+    polygon : str
+        Polygon for search (overrides bounding_box) or None.
+    filename_filter : str
+        Pattern for producer granule id (e.g., *vv*) or None.
+    verbose : bool, optional
+        Print query urls. The default is False.
+    concurrent : bool, optional
+        Read first page for hit count, then fetch the remaining pages in
+        parallel. The default is False.
+    numWorkers : int, optional
+        Number of threads for concurrent page requests. The default is 4.
+    searchAfter : bool, optional
+        Page with CMR-Search-After instead of page numbers. This removes the
+        30,000 granule limit and keeps the cost per page constant. Pages are
+        requested in sequence, so concurrent is ignored. The default is False.
+    useCache : bool, optional
+        Use the on-disk response cache (cmr.cache) and granule index
+        (cmr.index). Set False to always query CMR. The default is True.
+    Returns
+    -------
+    urls : list of str
+        urls sorted by start date and granule id (at most 30,000 granules
+        unless searchAfter is True).
+    '''
+    # Polygon searches are not indexed
+    useIndex = useCache and index is not None and not polygon
+    if useIndex:
+        try:
+            urls = index.search(short_name, version, time_start, time_end,
+                                bounding_box, filename_filter,
+                                endpoint=cmr_endpoint())
+        except sqlite3.Error as e:
+            _store_failed(index, e)
+            urls, useIndex = None, False
+        if urls is not None:
+            if verbose:
+                print(f'{len(urls)} urls from granule index')
+            return urls
+    pages = _search_pages(short_name, version, time_start, time_end,
+                          bounding_box, polygon, filename_filter,
+                          verbose=verbose, concurrent=concurrent,
+                          numWorkers=numWorkers, searchAfter=searchAfter,
+                          useCache=useCache)
+    entryUrls = []
+    nEntries = 0
+    for search_results in pages:
+        # print(search_results)
+        entryUrls += cmr_filter_entries(search_results)
+        nEntries += len(search_results['feed']['entry'])
+    # Only index complete searches (not truncated at CMR_MAX_PAGES)
+    if useIndex and (searchAfter or
+                     nEntries < CMR_PAGE_SIZE * CMR_MAX_PAGES):
+        try:
+            index.add(short_name, version, time_start, time_end,
+                      bounding_box, filename_filter, entryUrls,
+                      endpoint=cmr_endpoint())
+        except sqlite3.Error as e:
+            _store_failed(index, e)
+    return [str(url) for _, url in entryUrls]
+
+
+def granule_table(urls):
+    '''
+    Parse urls once into a table with a row per url and columns:
+    url, filename, product (e.g., NSIDC-0725), version, box (TSX/OPT box
+    name or ''), band (e.g., vv or ''), date1, date2 (first and second
+    dates in the file name, e.g., 01Dec14_30Nov15). All parsing is
+    vectorized.
+
+    Parameters
+    ----------
+    urls : list of str
+        urls from get_urls.
+    Returns
+    -------
+    granules : pandas DataFrame
+    '''
+    # Imported here since pandas dominates the import time for searches
+    import pandas as pd
+    urls = pd.Series(urls, dtype=str)
+    parts = urls.str.split('/')
+    filename = parts.str[-1]
+    datePattern = r'_(\d{2}[A-Z][a-z]{2}\d{2})_(\d{2}[A-Z][a-z]{2}\d{2})'
+    dates = filename.str.extract(datePattern)
+    isBox = filename.str.contains('TSX|OPT', regex=True)
+    granules = pd.DataFrame({
+        'url': urls,
+        'filename': filename,
+        'product': parts.str[-6].str.split('.').str[0].fillna(''),
+        'version': parts.str[-5].fillna(''),
+        'box': filename.str.split('_').str[1].where(isBox, '').fillna(''),
+        'band': filename.str.extract(bandPattern)[0].fillna(''),
+        'date1': pd.to_datetime(dates[0], format='%d%b%y'),
+        'date2': pd.to_datetime(dates[1], format='%d%b%y')})
+    for column in ['product', 'version', 'box', 'band']:
+        granules[column] = granules[column].astype('category')
+    return granules
+
+
+def get_granules(short_name, version, time_start, time_end, bounding_box,
+                 polygon, filename_filter, **kwargs):
+    ''' Return the results of get_urls (same arguments and keywords) as a
+    granule_table '''
+    return granule_table(get_urls(short_name, version, time_start, time_end,
+                                  bounding_box, polygon, filename_filter,
+                                  **kwargs))
+
+
+def search_many(specs, numWorkers=4, **kwargs):
+    '''
+    Run several searches concurrently over the shared connection pool.
+
+    Parameters
+    ----------
+    specs : list of tuples
+        Each is (short_name, version, time_start, time_end, bounding_box,
+        polygon, filename_filter) as for get_urls.
+    numWorkers : int, optional
+        Number of searches to run at once. The default is 4.
+    **kwargs :
+        Other keywords for get_urls (e.g., searchAfter=True).
+    Returns
+    -------
+    results : dict
+        {spec: urls} for each spec.
+    '''
+    specs = [tuple(x) for x in specs]
+    with ThreadPoolExecutor(max_workers=numWorkers) as executor:
+        futures = {spec: executor.submit(get_urls, *spec, **kwargs)
+                   for spec in specs}
+        return {spec: future.result() for spec, future in futures.items()}
+
+
+def iter_url_pages(short_name, version, time_start, time_end, bounding_box,
+                   polygon, filename_filter, verbose=False, searchAfter=False,
+                   useCache=True):
+    '''
+    Generator that yields the list of urls for each page as it arrives.
+    Pages are requested only as the generator is consumed. Duplicate
+    filenames are excluded across all pages, not just within a page.
+    Parameters are the same as for get_urls.
+    '''
+    unique_filenames = set()
+    for search_results in _search_pages(short_name, version, time_start,
+                                        time_end, bounding_box, polygon,
+                                        filename_filter, verbose=verbose,
+                                        searchAfter=searchAfter,
+                                        useCache=useCache):
+        yield [str(url) for url in cmr_filter_urls(
+            search_results, unique_filenames=unique_filenames)]
+
+
+def iter_urls(short_name, version, time_start, time_end, bounding_box,
+              polygon, filename_filter, verbose=False, searchAfter=False,
+              useCache=True):
+    '''
+    Generator version of get_urls that yields urls as each page arrives, so
+    the first results can be used while later pages are still being
+    searched. Pages are requested only as the generator is consumed.
+    Duplicate filenames are excluded across all pages, not just within a
+    page. Parameters are the same as for get_urls.
+    '''
+    for urls in iter_url_pages(short_name, version, time_start, time_end,
+                               bounding_box, polygon, filename_filter,
+                               verbose=verbose, searchAfter=searchAfter,
+                               useCache=useCache):
+        yield from urls
+
+
+def sync_urls(short_name, version, time_start, time_end, bounding_box,
+              polygon, filename_filter, catalog=None, verbose=False):
+    '''
+    Return the urls for a search from a local catalog after updating it with
+    only the granules created or revised at CMR since the last sync. The
+    first sync for a search does a full search. Parameters are the same as
+    for get_urls, plus:
+
+    catalog : cmrCatalog, optional
+        Catalog to update. The default is None, which uses
+        ~/.grimp_cmr_catalog.sqlite.
+
+    Note granules deleted from CMR are not removed from the catalog; use
+    catalog.remove(key) to force a full search.
+    '''
+    if catalog is None:
+        catalog = cmrCatalog()
+    key = catalog.syncKey(short_name, version, time_start, time_end,
+                          bounding_box, polygon, filename_filter)
+    lastSync = catalog.lastSync(key)
+    # Take the time before searching so revisions during the search are
+    # picked up next time
+    syncTime = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    records = []
+    unique_filenames = set()
+    for search_results in _search_pages(short_name, version, time_start,
+                                        time_end, bounding_box, polygon,
+                                        filename_filter, verbose=verbose,
+                                        searchAfter=True, useCache=False,
+                                        revision_date=lastSync):
+        records += [(entry.get('producer_granule_id', url),
+                     entry.get('time_start', ''), url)
+                    for entry, url in cmr_filter_entries(
+                        search_results, unique_filenames=unique_filenames)]
+    if verbose:
+        print(f'{len(records)} urls added or revised since {lastSync}')
+    catalog.merge(key, records, syncTime)
+    return catalog.urls(key)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk cache for CMR search responses.
+
+@author: ian
+"""
+import json
+import time
+import zlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from grimpfunc.sqliteStore import sqliteStore
+
+# Headers that are needed to reuse a cached page
+cachedHeaders = ['CMR-Hits', 'CMR-Search-After']
+
+
+class cmrCache(sqliteStore):
+    ''' Cache CMR responses in a SQLite file, keyed on the normalized query
+    url (and search-after token) so repeated searches skip the network '''
+
+    tables = {'responses': 'CREATE TABLE IF NOT EXISTS responses (key TEXT '
+              'PRIMARY KEY, content BLOB, headers TEXT, size INTEGER, '
+              'created REAL, accessed REAL)'}
+
+    def __init__(self, cacheFile='~/.grimp_cmr_cache.sqlite', ttl=3600,
+                 maxSize=200e6):
+        '''
+        Parameters
+        ----------
+        cacheFile : str, optional
+            SQLite file for the cache. The default is
+            '~/.grimp_cmr_cache.sqlite'.
+        ttl : float, optional
+            Age in seconds after which entries are ignored. The default is
+            3600.
+        maxSize : float, optional
+            Maximum size in bytes of the cached responses, least recently used
+            entries are removed above this. The default is 200e6.
+        Returns
+        -------
+        None.
+        '''
+        super().__init__(cacheFile)
+        self.ttl = ttl
+        self.maxSize = maxSize
+
+    def _key(self, query_url, search_after=None):
+        ''' Normalize the query so parameter order does not matter. Repeated
+        parameters (e.g., sort_key[]) keep their order.'''
+        parts = urlsplit(query_url)
+        params = sorted(parse_qsl(parts.query), key=lambda x: x[0])
+        key = f'{parts.netloc}{parts.path}?{urlencode(params)}'
+        if search_after is not None:
+            key += f'#{search_after}'
+        return key
+
+    def get(self, query_url, search_after=None, parse=json.loads):
+        ''' Return (search_results, headers) for a query, or None if the
+        query is not cached or is older than ttl. The cached content is
+        converted with parse.'''
+        key = self._key(query_url, search_after)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT content, headers, created FROM responses '
+                'WHERE key = ?', (key,)).fetchone()
+            if row is None or time.time() - row[2] > self.ttl:
+                return None
+            connection.execute('UPDATE responses SET accessed = ? '
+                               'WHERE key = ?', (time.time(), key))
+        return parse(zlib.decompress(row[0])), json.loads(row[1])
+
+    def put(self, query_url, content, headers, search_after=None):
+        ''' Save the raw response content and CMR headers for a query '''
+        key = self._key(query_url, search_after)
+        content = zlib.compress(content)
+        headers = json.dumps({x: headers[x] for x in cachedHeaders
+                              if x in headers})
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (key, content, headers, len(content), now, now))
+            self._evict(connection, 'responses', self.maxSize, self.ttl)
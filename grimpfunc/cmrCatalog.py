@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local catalog of granule urls kept up to date with incremental CMR syncs.
+
+@author: ian
+"""
+import json
+from grimpfunc.sqliteStore import sqliteStore
+
+
+class cmrCatalog(sqliteStore):
+    ''' Store the granule urls for searches in a SQLite file along with the
+    time of the last sync, so later syncs only need granules revised since
+    then (see cmr.sync_urls) '''
+
+    tables = {'syncs': 'CREATE TABLE IF NOT EXISTS syncs (key TEXT PRIMARY '
+              'KEY, last_sync TEXT)',
+              'granules': 'CREATE TABLE IF NOT EXISTS granules (key TEXT, '
+              'granule_id TEXT, time_start TEXT, url TEXT, '
+              'PRIMARY KEY (key, granule_id, url))'}
+
+    def __init__(self, catalogFile='~/.grimp_cmr_catalog.sqlite'):
+        '''
+        Parameters
+        ----------
+        catalogFile : str, optional
+            SQLite file for the catalog. The default is
+            '~/.grimp_cmr_catalog.sqlite'.
+        Returns
+        -------
+        None.
+        '''
+        super().__init__(catalogFile)
+
+    def syncKey(self, short_name, version, time_start, time_end,
+                bounding_box, polygon, filename_filter):
+        ''' Key identifying a search '''
+        return json.dumps([short_name, str(version), time_start, time_end,
+                           bounding_box, polygon, filename_filter])
+
+    def lastSync(self, key):
+        ''' Return the time of the last sync for key, or None if never
+        synced '''
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT last_sync FROM syncs WHERE key = ?', (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def merge(self, key, records, syncTime):
+        '''
+        Merge granule records into the catalog and save the sync time.
+
+        Parameters
+        ----------
+        key : str
+            Search key from syncKey.
+        records : list of tuples
+            (granule_id, time_start, url) for each url. All existing urls for
+            these granules are replaced, so revised granules are updated.
+        syncTime : str
+            Time the sync query started (YYYY-MM-DDTHH:MM:SSZ).
+        Returns
+        -------
+        None.
+        '''
+        granuleIDs = {(key, x[0]) for x in records}
+        with self._transaction() as connection:
+            connection.executemany(
+                'DELETE FROM granules WHERE key = ? AND granule_id = ?',
+                granuleIDs)
+            connection.executemany(
+                'INSERT OR REPLACE INTO granules VALUES (?, ?, ?, ?)',
+                [(key, *x) for x in records])
+            connection.execute('INSERT OR REPLACE INTO syncs VALUES (?, ?)',
+                               (key, syncTime))
+
+    def urls(self, key):
+        ''' Return the urls for key sorted by start date and granule id '''
+        with self._transaction() as connection:
+            rows = connection.execute(
+                'SELECT url FROM granules WHERE key = ? '
+                'ORDER BY time_start, granule_id, url', (key,)).fetchall()
+        return [x[0] for x in rows]
+
+    def remove(self, key):
+        ''' Remove a search from the catalog, so the next sync is a full
+        search '''
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM granules WHERE key = ?', (key,))
+            connection.execute('DELETE FROM syncs WHERE key = ?', (key,))
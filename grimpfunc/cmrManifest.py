@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet manifests of search results (urls, product dates, and the searches
+that found them) so results can be reloaded without repeating the searches.
+
+@author: ian
+"""
+import json
+from datetime import datetime, timezone
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Schema metadata key for the search information
+manifestKey = b'grimpfunc'
+manifestVersion = 1
+
+
+def requirePyarrow():
+    ''' Raise ImportError if pyarrow, which is optional, is not installed '''
+    if pa is None:
+        raise ImportError('Parquet manifests need pyarrow (e.g., conda '
+                          'install pyarrow or pip install pyarrow)')
+
+
+def searchTime():
+    ''' Current UTC time as used for search times (YYYY-MM-DDTHH:MM:SSZ) '''
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def writeManifest(manifestFile, urls, metadata, dates=None):
+    '''
+    Write urls to a parquet manifest.
+
+    Parameters
+    ----------
+    manifestFile : str
+        Parquet file name.
+    urls : list of str
+        The urls.
+    metadata : dict
+        JSON serializable search information (e.g., searches list with the
+        search parameters, version, and searchTime for each).
+    dates : dict, optional
+        {url: date} for urls that are listed products. The default is None.
+    Returns
+    -------
+    None.
+    '''
+    requirePyarrow()
+    dates = {} if dates is None else dates
+    table = pa.table({'url': pa.array(urls, pa.string()),
+                      'date': pa.array([dates.get(x) for x in urls],
+                                       pa.string())})
+    metadata = {'manifestVersion': manifestVersion, 'created': searchTime(),
+                **metadata}
+    table = table.replace_schema_metadata(
+        {manifestKey: json.dumps(metadata)})
+    pq.write_table(table, manifestFile, compression='zstd')
+
+
+def readManifest(manifestFile):
+    '''
+    Read a parquet manifest written by writeManifest.
+
+    Parameters
+    ----------
+    manifestFile : str
+        Parquet file name.
+    Returns
+    -------
+    urls : list of str
+        The urls.
+    dates : dict
+        {url: date} for urls that are listed products.
+    metadata : dict
+        Search information.
+    '''
+    requirePyarrow()
+    table = pq.read_table(manifestFile)
+    schemaMetadata = table.schema.metadata or {}
+    if manifestKey not in schemaMetadata:
+        raise ValueError(f'{manifestFile} is not a grimpfunc manifest')
+    metadata = json.loads(schemaMetadata[manifestKey])
+    urls = table.column('url').to_pylist()
+    dates = {url: date for url, date in
+             zip(urls, table.column('date').to_pylist()) if date is not None}
+    return urls, dates, metadata
+
+
+def manifestAge(metadata):
+    ''' Return the age in seconds of the oldest search in a manifest, or None
+    if any search did not complete (or there are no searches) '''
+    searches = metadata.get('searches', [])
+    if not searches or not all(x.get('complete') for x in searches):
+        return None
+    oldest = min(datetime.strptime(x['searchTime'], '%Y-%m-%dT%H:%M:%SZ')
+                 for x in searches)
+    return (datetime.now(timezone.utc) -
+            oldest.replace(tzinfo=timezone.utc)).total_seconds()
+
+
+def manifestFresh(metadata, maxAge):
+    ''' Return True if all searches in the manifest completed within maxAge
+    seconds '''
+    age = manifestAge(metadata)
+    return age is not None and age <= maxAge
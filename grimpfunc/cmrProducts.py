@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GrIMP product tables and the url filtering used by cmrUrls, without panel or
+param, so searches can be run headless (see batchSearch).
+
+@author: ian
+"""
+import re
+from datetime import datetime
+import pandas as pd
+from grimpfunc.cmr import resolve_version
+
+modes = {'none': {'productIndexes': [0, 1, 2, 3, 4, 5, 6, 7],
+                  'boxNames': False, 'cumulative': True,
+                  'defaultProduct': 'NSIDC-0725'},
+
+         'subsetter': {'productIndexes': [1, 2, 3, 4, 5, 6, 7],
+                       'boxNames': True, 'cumulative': False,
+                       'defaultProduct': 'NSIDC-0725'},
+         'nisar': {'productIndexes': [2, 3, 4, 5],
+                   'boxNames': False, 'cumulative': False,
+                   'defaultProduct': 'NSIDC-0725'},
+         'image': {'productIndexes': [1],
+                   'boxNames': False, 'cumulative': False,
+                   'defaultProduct': 'NSIDC-0723'},
+         'terminus': {'productIndexes': [0],
+                      'boxNames': False, 'cumulative': False,
+                      'defaultProduct': 'NSIDC-0642'}
+         }
+
+products = ['NSIDC-0642',
+            'NSIDC-0723',
+            'NSIDC-0725', 'NSIDC-0727', 'NSIDC-0731', 'NSIDC-0766',
+            'NSIDC-0481', 'NSIDC-0646']
+
+TSXBoxes = ['E61.10N', 'E61.70N', 'E62.10N', 'E62.55N', 'E63.00N', 'E63.35N',
+            'E63.85N', 'E64.35N', 'E64.65N', 'E65.10N', 'E65.55N', 'E66.50N',
+            'E66.60N', 'E66.90N', 'E67.55N', 'E68.50N', 'E68.80N', 'E71.75N',
+            'E78.90N', 'E79.40N', 'E81.35N', 'E81.45N', 'S44.84W', 'S45.43W',
+            'S46.31W', 'S46.91W', 'W61.70N', 'W62.10N', 'W64.25N', 'W64.75N',
+            'W67.05N', 'W68.60N', 'W69.10N', 'W69.95N', 'W70.55N', 'W70.90N',
+            'W71.65N', 'W72.00N', 'W72.90N', 'W73.45N', 'W73.75N', 'W74.50N',
+            'W74.95N', 'W75.50N', 'W75.85N', 'W76.10N', 'W76.25N', 'W76.35N',
+            'W76.40N', 'W76.45N', 'W77.55N', 'W79.75N', 'W80.75N', 'W81.25N',
+            'W81.50N']
+
+OPTBoxes = ['E61.10N', 'E61.70N', 'E62.10N', 'E62.55N', 'E63.00N', 'E63.35N',
+            'E63.85N', 'E64.35N', 'E64.65N', 'E65.10N', 'E65.55N', 'E66.00N',
+            'E66.50N', 'E66.60N', 'E66.90N', 'E67.55N', 'E68.05N', 'E68.50N',
+            'E68.52N', 'E68.75N', 'E68.80N', 'E68.95N', 'E69.30N', 'E69.80N',
+            'E69.90N', 'E70.10N', 'E70.40N', 'E71.05N', 'E71.75N', 'E71.95N',
+            'E74.05N', 'E75.15N', 'E75.70N', 'E76.55N', 'E77.55N', 'E78.95N',
+            'E79.40N', 'S44.15W', 'S44.84W', 'S45.43W', 'S46.31W', 'S46.91W',
+            'W61.30N', 'W61.70N', 'W62.10N', 'W63.05N', 'W64.25N', 'W64.75N',
+            'W67.95N', 'W69.10N', 'W69.95N', 'W70.55N', 'W70.90N', 'W71.25N',
+            'W71.65N', 'W72.00N', 'W72.90N', 'W73.45N', 'W73.75N', 'W74.50N',
+            'W74.95N', 'W75.50N', 'W75.85N', 'W76.10N', 'W76.25N', 'W76.30N',
+            'W76.33N', 'W76.35N', 'W76.40N', 'W76.45N', 'W77.55N', 'W77.80N',
+            'W79.75N', 'W80.75N']
+
+velocityMosaics = ['NSIDC-0725', 'NSIDC-0727', 'NSIDC-0731', 'NSIDC-0766']
+
+velocityOptions = ['browse', 'speed', 'velocity', 'velocity+errors', 'all']
+
+productOptions = {'NSIDC-0642': ['termini'],
+                  'NSIDC-0723': ['image', 'gamma0', 'sigma0'],
+                  'NSIDC-0725': velocityOptions,
+                  'NSIDC-0727': velocityOptions,
+                  'NSIDC-0731': velocityOptions,
+                  'NSIDC-0766': velocityOptions,
+                  'NSIDC-0481': velocityOptions[1:],
+                  'NSIDC-0646': velocityOptions[1:]
+                  }
+# Current versions, if versions updated at DAAC, will try later version
+versions = {'NSIDC-0723': '4', 'NSIDC-0725': '5', 'NSIDC-0727': '5',
+            'NSIDC-0731': '5', 'NSIDC-0642': '2', 'NSIDC-0766': '2',
+            'NSIDC-0481': '3', 'NSIDC-0646': '3'
+            }
+defaultProduct = 'NSIDC-0725'
+
+productGroups = {'browse': ['browse'],
+                 'speed': ['vv'], '-': ['vv'], 'vx': 'vx',
+                 'velocity': ['vv', 'vx', 'vy'],
+                 'velocity+errors': ['vv', 'vx', 'vy', 'ex', 'ey'],
+                 'all': ['vv', 'vx', 'vy', 'ex', 'ey', 'browse', 'dT'],
+                 'sigma0': ['sigma0'],
+                 'gamma0': ['gamma0'],
+                 'image':  ['image'],
+                 'termini': ['termini']
+                 }
+fileTypes = dict.fromkeys(productGroups.keys(), ['.tif'])  # Set all to tif
+fileTypes['termini'] = ['.shp']  # shp
+
+defaultBounds = {'LatMin': 60, 'LatMax': 82, 'LonMin': -75, 'LonMax': -5}
+
+dateFormat1, dateFormat2 = '%Y-%m-%dT00:00:01Z', '%Y-%m-%dT00:23:59'
+
+
+def _toDate(date):
+    ''' Convert "YYYY-MM-DD" to a date, dates are returned unchanged '''
+    if isinstance(date, str):
+        return datetime.strptime(date, '%Y-%m-%d').date()
+    return date
+
+
+def boundingBoxString(bounds):
+    ''' Convert {'LatMin', 'LatMax', 'LonMin', 'LonMax'} to the
+    "lonmin,latmin,lonmax,latmax" bounding box for get_urls '''
+    return f"{bounds['LonMin']:.2f},{bounds['LatMin']:.2f}," \
+        f"{bounds['LonMax']:.2f},{bounds['LatMax']:.2f}"
+
+
+def searchParams(product, productFilter, firstDate, lastDate, bounding_box,
+                 boxNames=False):
+    '''
+    Return the get_urls search arguments for a product search.
+
+    Parameters
+    ----------
+    product : str
+        Product (e.g., NSIDC-0725).
+    productFilter : str
+        Product filter (e.g., speed). For boxNames searches of NSIDC-0481 and
+        0646 this is the box name (e.g., W69.10N).
+    firstDate, lastDate : str or date
+        Date range ("YYYY-MM-DD" or date).
+    bounding_box : str
+        "lonmin,latmin,lonmax,latmax".
+    boxNames : bool, optional
+        Restrict NSIDC-0481/0646 searches to the box in productFilter. The
+        default is False.
+    Returns
+    -------
+    tuple
+        (short_name, version, time_start, time_end, bounding_box, polygon,
+         filename_filter).
+    '''
+    pattern = '*'
+    if boxNames and product in ['NSIDC-0481', 'NSIDC-0646']:
+        pattern = f'*{productFilter}*'  # Include TSX box for subset
+    # Future proof by using a later version if current not found
+    version = resolve_version(product, versions[product])
+    return (product, version, _toDate(firstDate).strftime(dateFormat1),
+            _toDate(lastDate).strftime(dateFormat2), bounding_box, None,
+            pattern)
+
+
+def filterUrls(allUrls, productFilter):
+    ''' Return the urls that match the product filter, sorted '''
+    newUrls = []
+    for url in allUrls:
+        # get all urls for group (e.g., vx)
+        for productGroup in productGroups[productFilter]:
+            for suffix in fileTypes[productFilter]:
+                if productGroup in url and url.endswith(suffix):
+                    newUrls.append(url)
+    # Return filtered list sorted.
+    return sorted(newUrls)
+
+
+def productDates(urls, productFilter):
+    '''
+    Return the product (file) name and date for each url with a file type
+    for the product filter.
+
+    Parameters
+    ----------
+    urls : list of str
+        Urls from a search.
+    productFilter : str
+        Product filter (e.g., speed).
+    Returns
+    -------
+    names, dates : list of str
+        Product names and dates (YYYY-MM-DD).
+    '''
+    # urls with any of the file types for the filter
+    urls = pd.Series(urls, dtype=str)
+    groups = [re.escape(x) for x in productGroups[productFilter]]
+    urls = urls[urls.str.contains('|'.join(groups))]
+    # Product name and date for each url from the .../YYYY/MM/DD/filename
+    # directories before the file name
+    parts = urls.str.split('/')
+    y, m, d = [parts.str[i].astype(int).astype(str) for i in range(-4, -1)]
+    dates = y.str.zfill(4) + '-' + m.str.zfill(2) + '-' + d.str.zfill(2)
+    return list(parts.str[-1]), list(dates)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the CMR granule search, serving synthetic granules.json
+pages so searches can be tested and benchmarked without NASA.
+
+@author: ian
+"""
+import json
+import time
+import random
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+standInDataUrl = 'https://data.standin.local/nsidc-cumulus-prod-protected'
+
+
+class cmrStandIn():
+    ''' Threaded HTTP server that answers granules.json and collections.json
+    queries with synthetic GrIMP 6/12-day velocity granules '''
+
+    def __init__(self, hits=10000, latency=0., errorRate=0., searchAfter=True,
+                 versions=['2'], port=0):
+        '''
+        Parameters
+        ----------
+        hits : int, optional
+            Number of granules matching any search. The default is 10000.
+        latency : float, optional
+            Seconds to wait before answering each request. The default is 0.
+        errorRate : float, optional
+            Fraction of requests answered with 503 (Retry-After: 0). The
+            default is 0.
+        searchAfter : bool, optional
+            Return CMR-Search-After headers. The default is True.
+        versions : list of str, optional
+            Versions with granules for collections.json. The default is
+            ['2'].
+        port : int, optional
+            Port, 0 picks a free port. The default is 0.
+        Returns
+        -------
+        None.
+        '''
+        self.hits = hits
+        self.latency = latency
+        self.errorRate = errorRate
+        self.searchAfter = searchAfter
+        self.versions = versions
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port),
+                                          self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        ''' Base url to pass to cmr.set_cmr_url '''
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        ''' Start serving in a background thread '''
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        ''' Stop the server '''
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @staticmethod
+    def entry(i):
+        ''' Synthetic CMR entry for granule i, with a data link and the
+        inherited and OPeNDAP links that cmr_filter_urls excludes '''
+        # 6 bands per pair, with a sequential pair number so names are unique
+        pair = i // 6
+        date1 = datetime(2014, 1, 1) + timedelta(hours=4 * pair)
+        date2 = date1 + timedelta(days=6 if pair % 2 else 12)
+        band = ['vv', 'vx', 'vy', 'ex', 'ey', 'dT'][i % 6]
+        filename = (f'GL_vel_mosaic_6d_{pair:07d}_{date1:%d%b%y}_'
+                    f'{date2:%d%b%y}_{band}_v02.0.tif')
+        # NSIDC layout: .../MEASURES/product/version/YYYY/MM/DD/filename
+        href = (f'{standInDataUrl}/MEASURES/NSIDC-0766/2/{date1:%Y/%m/%d}/'
+                f'{filename}')
+        return {'id': f'G{i:09d}-NSIDC_CPRD',
+                'producer_granule_id': filename,
+                'time_start': f'{date1:%Y-%m-%dT%H:%M:%S}.000Z',
+                'time_end': f'{date2:%Y-%m-%dT%H:%M:%S}.000Z',
+                'updated': '2024-01-01T00:00:00.000Z',
+                'boxes': ['60 -75 82 -5'],
+                'links': [{'href': href, 'rel':
+                           'http://esipfn.org/ns/2015#data#'},
+                          {'href': f'{href}.xml', 'inherited': True, 'rel':
+                           'http://esipfn.org/ns/2015#metadata#'},
+                          {'href': f'{href}.opendap', 'title': 'OPeNDAP',
+                           'rel': 'http://esipfn.org/ns/2015#data#'}]}
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _page(start, stop):
+        ''' Encoded page of granules start..stop-1 '''
+        return json.dumps({'feed': {'entry': [cmrStandIn.entry(i)
+                                              for i in range(start, stop)]}}
+                          ).encode()
+
+    def _handler(self):
+        ''' Request handler bound to this stand-in '''
+        standIn = self
+
+        class handler(BaseHTTPRequestHandler):
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers={}):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with standIn._lock:
+                    standIn.requests += 1
+                if standIn.latency:
+                    time.sleep(standIn.latency)
+                if random.random() < standIn.errorRate:
+                    with standIn._lock:
+                        standIn.errors += 1
+                    self._send(503, b'{"errors": ["injected error"]}',
+                               {'Retry-After': '0'})
+                    return
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                if parts.path.endswith('collections.json'):
+                    version = query.get('version', [''])[0]
+                    entries = [{'short_name': query.get('short_name', [''])[0],
+                                'version_id': version}] \
+                        if version in standIn.versions else []
+                    self._send(200, json.dumps({'feed': {'entry': entries}}
+                                               ).encode())
+                    return
+                pageSize = int(query.get('page_size', ['10'])[0])
+                searchAfter = self.headers.get('CMR-Search-After')
+                if searchAfter is not None:
+                    start = json.loads(searchAfter)[0]
+                else:
+                    start = (int(query.get('page_num', ['1'])[0]) - 1) * \
+                        pageSize
+                start = min(start, standIn.hits)
+                stop = min(start + pageSize, standIn.hits)
+                headers = {'CMR-Hits': str(standIn.hits)}
+                if standIn.searchAfter and stop > start:
+                    headers['CMR-Search-After'] = json.dumps([stop])
+                self._send(200, standIn._page(start, stop), headers)
+
+        return handler
@@ -6,94 +6,23 @@ Created on Fri Mar 19 15:37:45 2021
 @author: ian
 """
 import param
+import heapq
+import threading
+import time
 import numpy as np
 from datetime import datetime
 import pandas as pd
 import grimpfunc as grimp
+from grimpfunc import cmrProducts, boxIndex
+from grimpfunc.cmrProducts import modes, products, TSXBoxes, OPTBoxes, \
+    velocityMosaics, productOptions, \
+    defaultProduct, productGroups, fileTypes, defaultBounds
+from grimpfunc.cmrManifest import writeManifest, readManifest, \
+    manifestFresh, searchTime
 import panel as pn
 
-modes = {'none': {'productIndexes': [0, 1, 2, 3, 4, 5, 6, 7],
-                  'boxNames': False, 'cumulative': True,
-                  'defaultProduct': 'NSIDC-0725'},
-
-         'subsetter': {'productIndexes': [1, 2, 3, 4, 5, 6, 7],
-                       'boxNames': True, 'cumulative': False,
-                       'defaultProduct': 'NSIDC-0725'},
-         'nisar': {'productIndexes': [2, 3, 4, 5],
-                   'boxNames': False, 'cumulative': False,
-                   'defaultProduct': 'NSIDC-0725'},
-         'image': {'productIndexes': [1],
-                   'boxNames': False, 'cumulative': False,
-                   'defaultProduct': 'NSIDC-0723'},
-         'terminus': {'productIndexes': [0],
-                      'boxNames': False, 'cumulative': False,
-                      'defaultProduct': 'NSIDC-0642'}
-         }
-
-products = ['NSIDC-0642',
-            'NSIDC-0723',
-            'NSIDC-0725', 'NSIDC-0727', 'NSIDC-0731', 'NSIDC-0766',
-            'NSIDC-0481', 'NSIDC-0646']
-
-TSXBoxes = ['E61.10N', 'E61.70N', 'E62.10N', 'E62.55N', 'E63.00N', 'E63.35N',
-            'E63.85N', 'E64.35N', 'E64.65N', 'E65.10N', 'E65.55N', 'E66.50N',
-            'E66.60N', 'E66.90N', 'E67.55N', 'E68.50N', 'E68.80N', 'E71.75N',
-            'E78.90N', 'E79.40N', 'E81.35N', 'E81.45N', 'S44.84W', 'S45.43W',
-            'S46.31W', 'S46.91W', 'W61.70N', 'W62.10N', 'W64.25N', 'W64.75N',
-            'W67.05N', 'W68.60N', 'W69.10N', 'W69.95N', 'W70.55N', 'W70.90N',
-            'W71.65N', 'W72.00N', 'W72.90N', 'W73.45N', 'W73.75N', 'W74.50N',
-            'W74.95N', 'W75.50N', 'W75.85N', 'W76.10N', 'W76.25N', 'W76.35N',
-            'W76.40N', 'W76.45N', 'W77.55N', 'W79.75N', 'W80.75N', 'W81.25N',
-            'W81.50N']
-
-OPTBoxes = ['E61.10N', 'E61.70N', 'E62.10N', 'E62.55N', 'E63.00N', 'E63.35N',
-            'E63.85N', 'E64.35N', 'E64.65N', 'E65.10N', 'E65.55N', 'E66.00N',
-            'E66.50N', 'E66.60N', 'E66.90N', 'E67.55N', 'E68.05N', 'E68.50N',
-            'E68.52N', 'E68.75N', 'E68.80N', 'E68.95N', 'E69.30N', 'E69.80N',
-            'E69.90N', 'E70.10N', 'E70.40N', 'E71.05N', 'E71.75N', 'E71.95N',
-            'E74.05N', 'E75.15N', 'E75.70N', 'E76.55N', 'E77.55N', 'E78.95N',
-            'E79.40N', 'S44.15W', 'S44.84W', 'S45.43W', 'S46.31W', 'S46.91W',
-            'W61.30N', 'W61.70N', 'W62.10N', 'W63.05N', 'W64.25N', 'W64.75N',
-            'W67.95N', 'W69.10N', 'W69.95N', 'W70.55N', 'W70.90N', 'W71.25N',
-            'W71.65N', 'W72.00N', 'W72.90N', 'W73.45N', 'W73.75N', 'W74.50N',
-            'W74.95N', 'W75.50N', 'W75.85N', 'W76.10N', 'W76.25N', 'W76.30N',
-            'W76.33N', 'W76.35N', 'W76.40N', 'W76.45N', 'W77.55N', 'W77.80N',
-            'W79.75N', 'W80.75N']
-
-velocityMosaics = ['NSIDC-0725', 'NSIDC-0727', 'NSIDC-0731', 'NSIDC-0766']
-
-velocityOptions = ['browse', 'speed', 'velocity', 'velocity+errors', 'all']
-
-productOptions = {'NSIDC-0642': ['termini'],
-                  'NSIDC-0723': ['image', 'gamma0', 'sigma0'],
-                  'NSIDC-0725': velocityOptions,
-                  'NSIDC-0727': velocityOptions,
-                  'NSIDC-0731': velocityOptions,
-                  'NSIDC-0766': velocityOptions,
-                  'NSIDC-0481': velocityOptions[1:],
-                  'NSIDC-0646': velocityOptions[1:]
-                  }
-# Current versions, if versions updated at DAAC, will try later version
-versions = {'NSIDC-0723': '4', 'NSIDC-0725': '5', 'NSIDC-0727': '5',
-            'NSIDC-0731': '5', 'NSIDC-0642': '2', 'NSIDC-0766': '2',
-            'NSIDC-0481': '3', 'NSIDC-0646': '3'
-            }
-defaultProduct = 'NSIDC-0725'
-
-productGroups = {'browse': ['browse'],
-                 'speed': ['vv'], '-': ['vv'], 'vx': 'vx',
-                 'velocity': ['vv', 'vx', 'vy'],
-                 'velocity+errors': ['vv', 'vx', 'vy', 'ex', 'ey'],
-                 'all': ['vv', 'vx', 'vy', 'ex', 'ey', 'browse', 'dT'],
-                 'sigma0': ['sigma0'],
-                 'gamma0': ['gamma0'],
-                 'image':  ['image'],
-                 'termini': ['termini']
-                 }
-fileTypes = dict.fromkeys(productGroups.keys(), ['.tif'])  # Set all to tif
-fileTypes['termini'] = ['.shp']  # shp
-
-defaultBounds = {'LatMin': 60, 'LatMax': 82, 'LonMin': -75, 'LonMax': -5}
+# Rows per page in the results table
+resultPageSize = 50
 
 
 class cmrUrls(param.Parameterized):
@@ -128,11 +57,30 @@ class cmrUrls(param.Parameterized):
                                     end=defaultBounds['LonMax'])
     #
     Search = param.Boolean(False)
+    Cancel = param.Boolean(False)
     Clear = param.Boolean(False)
-    results = pd.DataFrame()
+    # Search status (hidden, shown by progressMessage)
+    progress = param.String('', precedence=-1)
 
     def __init__(self, mode='none', debug=False, date1=None, date2=None,
-                 verbose=False):
+                 verbose=False, background=True):
+        '''
+        Parameters
+        ----------
+        mode : str, optional
+            Search mode (none, subsetter, nisar, image, terminus). The
+            default is 'none'.
+        debug : bool, optional
+            Show debug messages. The default is False.
+        verbose : bool, optional
+            Print search urls. The default is False.
+        background : bool, optional
+            Run searches started with the Search button in a background
+            thread, adding results page by page. The default is True.
+        Returns
+        -------
+        None.
+        '''
         super().__init__()
         #
         self.mode = mode.lower()
@@ -169,12 +117,17 @@ class cmrUrls(param.Parameterized):
         # Init variables
         self.first = True
         self.cogs = []
-        self.urls = []
-        self.nUrls = 0
-        self.productList = []
-        self.nProducts = 0
-        self.newProductCount = 0
-        self.dates = []
+        self._resultTable = None
+        self.background = background
+        self._searchThread = None
+        self._cancelSearch = threading.Event()
+        # A background search is running, and another is queued behind it
+        self._searchActive = False
+        self._searchQueued = False
+        # Guards the results, which a background search updates
+        self._stateLock = threading.RLock()
+        self._searchGeneration = 0
+        self.resetData()
         self.debug = debug
         self.msg = 'Init'
     # initialize with empty list
@@ -200,8 +153,8 @@ class cmrUrls(param.Parameterized):
     def getIDs(self):
         ''' Get the unique list of ids from the cog and shape files'''
         files = self.getCogs() + self.getShapes()
-        fileIDs = [x.split('/')[-6].split('.')[0] for x in files]  # Find ids
-        return np.unique(fileIDs)  # Return the unique ids
+        fileIDs = grimp.granule_table(files)['product']  # Find ids
+        return np.unique(list(fileIDs))  # Return the unique ids
 
     @param.depends('Clear', watch=True)
     def clearData(self):
@@ -209,15 +162,114 @@ class cmrUrls(param.Parameterized):
         self.Clear = False
 
     def resetData(self):
-        self.products = []
-        self.urls = []
-        self.nUrls = 0
-        self.nProducts = 0
-        self.newProductCount = 0
-        self.dates = []
-        self.productList = []
-        self.results = pd.DataFrame(zip(self.dates, self.productList),
-                                    columns=['date', 'product'])
+        ''' Remove all results. A running background search is cancelled,
+        any pages it is still processing are discarded, and a queued search
+        is dropped. '''
+        self._cancelSearch.set()
+        with self._stateLock:
+            self._searchGeneration += 1
+            self._searchQueued = False
+            self.products = []
+            self.nUrls = 0
+            self.nProducts = 0
+            self.newProductCount = 0
+            # Hash indexes are the record of the results, so new results are
+            # checked without reprocessing old ones
+            self._urlSet = set()
+            self._productDates = {}
+            # Sorted views, and items added since they were last sorted
+            self._urls, self._newUrls = [], []
+            self._products, self._newProducts = [], []
+            self._results = pd.DataFrame(columns=['date', 'product'])
+            # Parameters and time of each search (for manifests)
+            self.searches = []
+
+    @property
+    def urls(self):
+        ''' Sorted urls, merging any added since the last call '''
+        with self._stateLock:
+            if self._newUrls:
+                self._urls = list(heapq.merge(self._urls,
+                                              sorted(self._newUrls)))
+                self._newUrls = []
+            return self._urls
+
+    @urls.setter
+    def urls(self, newUrls):
+        ''' Replace the urls (duplicates are dropped and they are kept
+        sorted) '''
+        with self._stateLock:
+            self._urlSet = {str(x) for x in newUrls}
+            self._urls, self._newUrls = sorted(self._urlSet), []
+            self.nUrls = len(self._urlSet)
+
+    def _sortedProducts(self):
+        ''' Return (product, date) sorted by product, merging new ones '''
+        with self._stateLock:
+            if self._newProducts:
+                self._results = pd.concat(
+                    [self._results,
+                     pd.DataFrame([(x[1], x[0]) for x in self._newProducts],
+                                  columns=['date', 'product'])],
+                    ignore_index=True).sort_values(by='date', kind='stable')
+                self._products = list(heapq.merge(
+                    self._products, sorted(self._newProducts)))
+                self._newProducts = []
+            return self._products
+
+    def _setProducts(self, productDates):
+        ''' Replace the products with {product: date} '''
+        with self._stateLock:
+            self._productDates = dict(productDates)
+            self._products = sorted(self._productDates.items())
+            self._newProducts = []
+            self._results = pd.DataFrame(
+                [(x[1], x[0]) for x in self._products],
+                columns=['date', 'product']).sort_values(by='date',
+                                                         kind='stable')
+            self.nProducts = len(self._productDates)
+
+    @property
+    def productList(self):
+        ''' Sorted product names '''
+        return [x[0] for x in self._sortedProducts()]
+
+    @productList.setter
+    def productList(self, names):
+        ''' Replace the products, keeping the dates of those already present
+        (others have no date until dates is set) '''
+        with self._stateLock:
+            self._sortedProducts()
+            self._setProducts({x: self._productDates.get(x) for x in names})
+
+    @property
+    def dates(self):
+        ''' Product dates in productList order '''
+        return [x[1] for x in self._sortedProducts()]
+
+    @dates.setter
+    def dates(self, newDates):
+        ''' Set the product dates in productList order '''
+        with self._stateLock:
+            names = self.productList
+            newDates = list(newDates)
+            if len(newDates) != len(names):
+                raise ValueError(f'{len(newDates)} dates for {len(names)} '
+                                 'products')
+            self._setProducts(zip(names, newDates))
+
+    @property
+    def results(self):
+        ''' Date sorted DataFrame of date and product '''
+        with self._stateLock:
+            self._sortedProducts()
+            return self._results
+
+    @results.setter
+    def results(self, newResults):
+        ''' Replace the products with those in a DataFrame with date and
+        product columns '''
+        self._setProducts(zip(newResults['product'], newResults['date']))
 
     @param.depends('Search', watch=True)
     def findData(self, initSearch=False):
@@ -225,76 +277,267 @@ class cmrUrls(param.Parameterized):
         # Return if not a button push (e.g., first)
         if not self.Search and not initSearch:
             return
+        # Search button runs in background so the kernel/UI stay responsive
+        if self.background and not initSearch:
+            # Reset the button so a press during this search is seen
+            self.Search = False
+            with self._stateLock:
+                if self._searchActive:
+                    # Stop the running search and start this one after it
+                    self._cancelSearch.set()
+                    self._searchQueued = True
+                    self.progress = 'Stopping the running search to start ' \
+                        'the new one...'
+                    return
+                self._startSearch()
+            return
+        # Foreground searches replace any background search
+        with self._stateLock:
+            self._searchQueued = False
+        self._cancelSearch.set()
+        self.waitForSearch()
         # Start fresh for each search if not cumulative
         if not modes[self.mode]['cumulative']:
             self.resetData()
-        #
         newUrls = self.getURLS()
         self.msg = len(newUrls)
-        # append list. Use unique to avoid selecting same data set
-        self.urls = [str(x) for x in np.unique(newUrls + self.urls)]
-        self.nUrls = len(self.urls)
+        # append list, skipping urls already found
+        self.addUrls(newUrls)
         self.updateProducts(newUrls)
-        self.results = pd.DataFrame(zip(self.dates, self.productList),
-                                    columns=['date', 'product']
-                                    ).sort_values(by='date')
         # reset get Data
         self.Search = False
 
+    def _startSearch(self):
+        ''' Start a background search with the current parameters '''
+        with self._stateLock:
+            # Start fresh for each search if not cumulative
+            if not modes[self.mode]['cumulative']:
+                self.resetData()
+            self._cancelSearch.clear()
+            self._searchActive = True
+            self._searchThread = threading.Thread(
+                target=self._searchPages, args=(self._searchGeneration,),
+                daemon=True)
+            self._searchThread.start()
+
+    def _searchPages(self, generation):
+        ''' Search page by page, adding results as each page arrives, until
+        done, cancelled, or the results are reset (generation changes) '''
+        nPages, nNew = 0, 0
+        self.newProductCount = 0
+        self.progress = 'Searching...'
+        try:
+            for newUrls in self.iterURLS():
+                # Add pages only if not cancelled or reset since starting
+                with self._stateLock:
+                    if self._cancelSearch.is_set() or \
+                            generation != self._searchGeneration:
+                        break
+                    nPages += 1
+                    self.addUrls(newUrls)
+                    self.updateProducts(newUrls)
+                    nNew += self.newProductCount
+                    self.newProductCount = nNew
+                self.progress = f'Searching: {nPages} pages, ' \
+                    f'{self.nUrls} granules'
+            status = 'cancelled' if self._cancelSearch.is_set() else 'done'
+            self.progress = f'Search {status}: {nPages} pages, ' \
+                f'{self.nUrls} granules'
+        except Exception as e:
+            self.progress = f'Search failed after {nPages} pages: {e}'
+        finally:
+            self.msg = self.nUrls
+            # Start a search queued while this one was running
+            with self._stateLock:
+                self._searchActive = False
+                if self._searchQueued:
+                    self._searchQueued = False
+                    self._startSearch()
+
+    def searching(self):
+        ''' Return True if a background search is running or queued '''
+        return self._searchActive
+
+    @param.depends('Cancel', watch=True)
+    def cancelSearch(self):
+        ''' Stop a background search after the current page, and drop any
+        search queued behind it '''
+        if self.Cancel:
+            with self._stateLock:
+                self._searchQueued = False
+            self._cancelSearch.set()
+            self.Cancel = False
+
+    def waitForSearch(self, timeout=None):
+        ''' Wait for a background search, and any search queued behind it,
+        to finish '''
+        endTime = None if timeout is None else time.time() + timeout
+        thread = self._searchThread
+        while thread is not None:
+            thread.join(None if endTime is None else
+                        max(endTime - time.time(), 0))
+            if thread.is_alive() or thread is self._searchThread:
+                return
+            thread = self._searchThread
+
+    def addUrls(self, newUrls):
+        ''' Add urls not already present. Returns the sorted list of urls
+        that were added. The cost depends on the number of new urls; the
+        sorted urls are only updated when next used.'''
+        addedUrls = sorted({str(x) for x in newUrls} - self._urlSet)
+        with self._stateLock:
+            addedUrls = [x for x in addedUrls if x not in self._urlSet]
+            self._urlSet.update(addedUrls)
+            self._newUrls += addedUrls
+            self.nUrls = len(self._urlSet)
+        return addedUrls
+
     def updateProducts(self, newUrls):
-        ''' Generate a list of the products in the url list'''
-        fileType = productGroups[self.productFilter][0]
-        oldCount = self.nProducts
-        # update list
-        for url in newUrls:
-            for fileType in productGroups[self.productFilter]:
-                if fileType in url:
-                    productName = url.split('/')[-1]
-                    self.productList.append(productName)
-                    # self.dates.append(url.split('/')[-2])
-                    m, y, d = [int(x) for x in url.split('/')[6:9]]
-                    self.dates.append(f'{y:4}-{m:02d}-{d:02d}')
-        self.productList, uIndex = np.unique(self.productList,
-                                             return_index=True)
-        self.productList = list(self.productList)
-        self.nProducts = len(self.productList)
-        self.dates = [self.dates[i] for i in uIndex]
-        self.newProductCount = self.nProducts - oldCount
+        ''' Add the products in newUrls to the product list, dates, and
+        results. Products already present are skipped using a hash index, so
+        the cost depends on the number of new urls; the sorted lists and
+        results are only updated when next used.'''
+        names, dates = cmrProducts.productDates(newUrls, self.productFilter)
+        newProducts = {}
+        with self._stateLock:
+            for productName, date in zip(names, dates):
+                if productName not in self._productDates:
+                    newProducts.setdefault(productName, date)
+            self._addProducts(newProducts)
+
+    def _addProducts(self, newProducts):
+        ''' Add {product: date} for products not already present '''
+        with self._stateLock:
+            self.newProductCount = len(newProducts)
+            self._productDates.update(newProducts)
+            self._newProducts += newProducts.items()
+            self.nProducts = len(self._productDates)
 
     def boundingBox(self):
         ''' Create bounding box string for search'''
         return f'{self.LonMin.value:.2f},{self.LatMin.value:.2f},' \
             f'{self.LonMax.value:.2f},{self.LatMax.value:.2f}'
 
+    def _searchParams(self):
+        ''' Return the get_urls search arguments for the current settings '''
+        return cmrProducts.searchParams(self.product, self.productFilter,
+                                        self.firstDate, self.lastDate,
+                                        self.boundingBox(),
+                                        boxNames=modes[self.mode]['boxNames'])
+
+    def filterUrls(self, allUrls):
+        ''' Return the urls that match the product filter, sorted '''
+        return cmrProducts.filterUrls(allUrls, self.productFilter)
+
+    def _recordSearch(self, searchParams):
+        ''' Save the parameters and start time of a search '''
+        keys = ['short_name', 'version', 'time_start', 'time_end',
+                'bounding_box', 'polygon', 'filename_filter']
+        search = dict(zip(keys, searchParams))
+        search.update({'productFilter': self.productFilter,
+                       'searchTime': searchTime(), 'complete': False})
+        self.searches.append(search)
+        return search
+
     def getURLS(self):
         ''' Get list of URLs for the product '''
-        dateFormat1, dateFormat2 = '%Y-%m-%dT00:00:01Z', '%Y-%m-%dT00:23:59'
-        version = versions[self.product]  # Current Version for product
-        #
-        polygon = None
-        bounding_box = self.boundingBox()
-        pattern = '*'
-        if modes[self.mode]['boxNames'] and \
-                (self.product == 'NSIDC-0481' or self.product == 'NSIDC-0646'):
-            pattern = f'*{self.productFilter}*'  # Include TSX box for subset
-        newUrls = []
-        # Future proof by increasing version if nothing found
-        for i in range(0, 5):
-            allUrls = grimp.get_urls(self.product, str(int(version) + i),
-                                     self.firstDate.strftime(dateFormat1),
-                                     self.lastDate.strftime(dateFormat2),
-                                     bounding_box, polygon, pattern,
-                                     verbose=self.verbose)
-            if len(allUrls) > 0:  # Some found so assume version current
-                break
-        for url in allUrls:
-            # get all urls for group (e.g., vx)
-            for productGroup in productGroups[self.productFilter]:
-                for suffix in fileTypes[self.productFilter]:
-                    if productGroup in url and url.endswith(suffix):
-                        newUrls.append(url)
-        # Return filtered list sorted.
-        return sorted(newUrls)
+        searchParams = self._searchParams()
+        search = self._recordSearch(searchParams)
+        allUrls = grimp.get_urls(*searchParams, verbose=self.verbose)
+        search['complete'] = True
+        return self.filterUrls(allUrls)
+
+    def iterURLS(self):
+        ''' Generator that yields the URLs for the product page by page '''
+        searchParams = self._searchParams()
+        search = self._recordSearch(searchParams)
+        for pageUrls in grimp.iter_url_pages(*searchParams,
+                                             verbose=self.verbose):
+            yield self.filterUrls(pageUrls)
+        search['complete'] = True
+
+    def saveManifest(self, manifestFile):
+        '''
+        Save the search results to a parquet manifest, which can be reloaded
+        with loadManifest instead of repeating the searches.
+
+        Parameters
+        ----------
+        manifestFile : str
+            Parquet file name (e.g., mySearch.parquet).
+        Returns
+        -------
+        None.
+        '''
+        if self.searching():
+            print('Warning: saving manifest while a search is running')
+        # Date for the first url of each listed product
+        dates = {}
+        with self._stateLock:
+            urls = list(self.urls)
+            for url in urls:
+                productName = url.split('/')[-1]
+                if productName in self._productDates and \
+                        productName not in dates:
+                    dates[productName] = url
+            dates = {url: self._productDates[x] for x, url in dates.items()}
+        state = {'product': self.product, 'productFilter': self.productFilter,
+                 'firstDate': self.firstDate.strftime('%Y-%m-%d'),
+                 'lastDate': self.lastDate.strftime('%Y-%m-%d'),
+                 'bounds': {x: getattr(self, x).value for x in defaultBounds}}
+        writeManifest(manifestFile, urls,
+                      {'mode': self.mode, 'state': state,
+                       'searches': self.searches}, dates=dates)
+
+    def loadManifest(self, manifestFile, maxAge=None):
+        '''
+        Replace the current results with those from a manifest written by
+        saveManifest and restore the search settings.
+
+        Parameters
+        ----------
+        manifestFile : str
+            Parquet file name.
+        maxAge : float, optional
+            Only load the manifest if all of its searches completed within
+            maxAge seconds. The default is None (always load).
+        Returns
+        -------
+        bool
+            True if the manifest was loaded.
+        '''
+        urls, dates, metadata = readManifest(manifestFile)
+        if maxAge is not None and not manifestFresh(metadata, maxAge):
+            if self.verbose:
+                print(f'{manifestFile} is older than {maxAge} s or incomplete')
+            return False
+        if metadata.get('mode', self.mode) != self.mode:
+            print(f'Warning: manifest mode ({metadata.get("mode")}) differs '
+                  f'from {self.mode}')
+        self.resetData()
+        self.addUrls(urls)
+        # Restore products in url order, keeping the first date as for search
+        products = {}
+        for url, date in zip(urls, map(dates.get, urls)):
+            if date is not None:
+                products.setdefault(url.split('/')[-1], date)
+        self._addProducts(products)
+        self.searches = metadata.get('searches', [])
+        self._restoreState(metadata.get('state', {}))
+        self.msg = self.nUrls
+        return True
+
+    def _restoreState(self, state):
+        ''' Set the search widgets from a saved manifest state '''
+        if state.get('product') in self.param.product.objects:
+            self.product = state['product']
+            if state.get('productFilter') in \
+                    self.param.productFilter.objects:
+                self.productFilter = state['productFilter']
+        if 'firstDate' in state and 'lastDate' in state:
+            self._setDates(state['firstDate'], state['lastDate'])
+        for bound, value in state.get('bounds', {}).items():
+            getattr(self, bound).value = value
 
     @param.depends('product', watch=True)
     def setProductOptions(self, productFilter=None):
@@ -332,35 +575,46 @@ class cmrUrls(param.Parameterized):
         self.LonMin.value = min(self.LonMin.value, self.LonMax.value - 1.)
 
     def result_view(self):
-        return pn.widgets.DataFrame(self.results,
-                                    height=600,   # fixed height
-                                    sizing_mode="fixed",
-                                    show_index=False,
-                                    fit_columns=False,
-                                    widths={'date': 100, 'product': 500}
-                                    )
+        ''' Paginated results table. Only the current page is sent to the
+        browser, with sorting and the date/product filters applied on the
+        server, so the table stays fast for large searches. The table is
+        reused so page, sort, and filters are kept as results arrive.'''
+        if self._resultTable is None:
+            filters = {'date': {'type': 'input', 'func': 'like',
+                                'placeholder': 'YYYY-MM-DD'},
+                       'product': {'type': 'input', 'func': 'like',
+                                   'placeholder': 'filter'}}
+            self._resultTable = pn.widgets.Tabulator(
+                self.results,
+                pagination='remote',
+                page_size=resultPageSize,
+                header_filters=filters,
+                disabled=True,
+                height=600,   # fixed height
+                sizing_mode="fixed",
+                show_index=False,
+                widths={'date': 100, 'product': 500})
+        else:
+            self._resultTable.value = self.results
+        return self._resultTable
 
     def TSXBoxNames(self, product='NSIDC-0481'):
-        ''' Get list of all TSX boxes'''
-        params = {'NSIDC-0481':
-                  ('2009-01-01T00:00:01Z', '2029-01-01T00:00:01Z', 'TSX'),
-                  'NSIDC-0646':
-                  ('2009-01-01T00:00:01Z', '2010-01-01T00:00:01Z', 'OPT')}
-        date1, date2, pattern = params[product]
-        for i in range(0, 5):
-            TSXurls = grimp.get_urls(product,
-                                     str(int(versions[product]) + i),
-                                     date1, date2,
-                                     self.boundingBox(), None, '*')
-            if len(TSXurls) > 0:
-                return self.findTSXBoxes(urls=TSXurls, pattern=pattern)
+        ''' Get list of the TSX (0481) or OPT (0646) boxes that intersect the
+        search area from the local box footprint index, which is refreshed
+        from CMR when stale. Returns None if there are no boxes.'''
+        boxes = boxIndex.glacierBoxes.intersecting(product,
+                                                   self.boundingBox())
+        if len(boxes) > 0:
+            return boxes
 
     def findTSXBoxes(self, urls=None, pattern='TSX'):
         ''' Return list of unique boxes for the cogs '''
         if urls is None:
             urls = self.getCogs()
-        boxes = list(np.unique([x.split('/')[-1].split('_')[1]
-                                for x in urls if pattern in x]))
+        granules = grimp.granule_table(urls)
+        boxes = granules['box'][granules['url'].str.contains(pattern,
+                                                             regex=False)]
+        boxes = [x for x in np.unique(list(boxes)) if x]
         if not boxes:  # Empty list, so fill with ''
             boxes = ['']
         return boxes
@@ -370,6 +624,9 @@ class cmrUrls(param.Parameterized):
             f'### {self.newProductCount} New Products\n'
             f'### {self.nUrls} Total Products')
 
+    def progressMessage(self):
+        return pn.pane.Markdown(self.progress)
+
     def debugMessage(self):
         if self.debug:
             msg = f'debug {self.msg}'
@@ -383,7 +640,8 @@ class cmrUrls(param.Parameterized):
         directionsPanel = pn.pane.Markdown('''
         ### Instructions:
         * Select a product, filter (e.g., speed), and date, and bounds
-        * Press Search to find products,
+        * Press Search to find products, results are added as each page
+          arrives; press Cancel to stop a search,
         * Repeat procedure to append additional products.
         * Press Clear to remove all results and start over
         ''')
@@ -408,6 +666,7 @@ class cmrUrls(param.Parameterized):
         names = [names[x] for x in modes[self.mode]['productIndexes']]
         # Clear precedence ensures this won't plot in subsetter mode
         searchWidgets['Clear'] = pn.widgets.Button
+        searchWidgets['Cancel'] = pn.widgets.Button
         #
         infoPanel = pn.Row(
             pn.pane.Markdown(
@@ -431,6 +690,7 @@ class cmrUrls(param.Parameterized):
         panels += [infoPanel]
         return pn.Row(pn.Column(*panels, min_width=leftWidth),
                       pn.Column(self.result_view, self.displayProductCount,
+                                self.progressMessage,
                                 self.debugMessage)).servable()
 
     def _formatDate(self, myDate):
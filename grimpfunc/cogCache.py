@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of COG headers (transform, crs, shape, dtype, block size and
+nodata) and STAC templates, and an array-like COG reader, so stacks can be
+built from cached headers without opening each file.
+
+@author: ian
+"""
+import os
+import json
+import math
+import time
+import threading
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+import numpy as np
+import requests
+import rasterio
+from rasterio.windows import Window, from_bounds
+from grimpfunc.sqliteStore import sqliteStore
+
+# GDAL settings for remote COGs: HTTP/2 multiplexing so concurrent reads
+# share connections, no directory listings, and a block cache for headers
+GDAL_OPTIONS = {'GDAL_HTTP_MULTIPLEX': 'YES',
+                'GDAL_HTTP_VERSION': '2',
+                'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+                'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+                'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.TIF,.tiff',
+                'CPL_VSIL_CURL_CACHE_SIZE': str(200 * 2**20),
+                'VSI_CACHE': 'TRUE',
+                'VSI_CACHE_SIZE': str(64 * 2**20)}
+
+_hostSemaphores = {}
+_hostLock = threading.Lock()
+# Number of processes sharing the per-host limits (see setProcessShare)
+processShare = 1
+
+
+def cogUrl(path):
+    ''' Strip the GDAL /vsicurl/ prefix and options from a path '''
+    if path.startswith('/vsicurl/'):
+        path = path[len('/vsicurl/'):]
+        if '&url=' in path:
+            path = path.split('&url=', 1)[1]
+    return path
+
+
+def setProcessShare(nProcesses):
+    ''' Set the number of processes that share the per-host limits, so each
+    allows maxPerHost // nProcesses reads. Use as a process pool initializer
+    (e.g., dask's multiprocessing.initializer) '''
+    global processShare
+    processShare = max(int(nProcesses), 1)
+
+
+def hostLimit(path, maxPerHost):
+    ''' Return a semaphore shared by all reads from the host of path that
+    limits them to maxPerHost at once, or a null context if maxPerHost is
+    None. The limit applies to each process, so with several processes
+    maxPerHost is divided among them (see setProcessShare). '''
+    if maxPerHost is None:
+        return nullcontext()
+    limit = max(maxPerHost // processShare, 1)
+    host = urlsplit(cogUrl(path)).netloc or 'local'
+    with _hostLock:
+        if (host, limit) not in _hostSemaphores:
+            _hostSemaphores[(host, limit)] = threading.BoundedSemaphore(limit)
+        return _hostSemaphores[(host, limit)]
+
+
+def readHeader(path, gdalOptions=None, maxPerHost=None):
+    '''
+    Open a COG once and return its header.
+
+    Parameters
+    ----------
+    path : str
+        File name or GDAL path (e.g., /vsicurl/...).
+    gdalOptions : dict, optional
+        GDAL configuration options for the read. The default is None.
+    maxPerHost : int, optional
+        Maximum concurrent reads from the same host. The default is None.
+    Returns
+    -------
+    header : dict
+        transform (6 coefficients), crs (WKT), width, height, count, dtype,
+        blockSize ([y, x]), and nodata.
+    '''
+    with hostLimit(path, maxPerHost), rasterio.Env(**(gdalOptions or {})), \
+            rasterio.open(path) as ds:
+        return {'transform': list(ds.transform)[0:6],
+                'crs': ds.crs.to_wkt() if ds.crs is not None else None,
+                'width': ds.width, 'height': ds.height, 'count': ds.count,
+                'dtype': ds.dtypes[0], 'blockSize': list(ds.block_shapes[0]),
+                'nodata': ds.nodata}
+
+
+def bboxWindow(header, bbox):
+    '''
+    Return the pixel window of a COG that covers a bounding box, with the
+    same rounding as rioxarray's clip_box.
+
+    Parameters
+    ----------
+    header : dict
+        Header from readHeader or cogHeaderCache.header.
+    bbox : dict
+        {'minx': minx, 'miny': miny, 'maxx': maxx, 'maxy': maxy} in the COG
+        projection.
+    Returns
+    -------
+    window : tuple or None
+        (rowOff, colOff, height, width) or None if the bbox is outside the
+        COG.
+    '''
+    transform = header['transform']
+    # Order bounds so the window is positive for either axis direction
+    left, right = (bbox['minx'], bbox['maxx']) if transform[0] > 0 else \
+        (bbox['maxx'], bbox['minx'])
+    bottom, top = (bbox['miny'], bbox['maxy']) if transform[4] < 0 else \
+        (bbox['maxy'], bbox['miny'])
+    window = from_bounds(left, bottom, right, top,
+                         transform=rasterio.Affine(*transform))
+    (row0, row1), (col0, col1) = window.toranges()
+    row0, col0 = max(math.floor(row0), 0), max(math.floor(col0), 0)
+    row1 = min(max(math.ceil(row1), 0), header['height'])
+    col1 = min(max(math.ceil(col1), 0), header['width'])
+    if row1 <= row0 or col1 <= col0:
+        return None
+    return row0, col0, row1 - row0, col1 - col0
+
+
+def fileValidator(url, timeout=30):
+    ''' Return the ETag or Last-Modified for an http(s) url, or mtime and
+    size for a local file, or None if not available '''
+    if url.startswith('http'):
+        try:
+            response = requests.head(url, allow_redirects=True,
+                                     timeout=timeout)
+            return response.headers.get('ETag',
+                                        response.headers.get('Last-Modified'))
+        except requests.RequestException:
+            return None
+    try:
+        stat = os.stat(url)
+        return f'{stat.st_mtime_ns}-{stat.st_size}'
+    except OSError:
+        return None
+
+
+class cogHeaderCache(sqliteStore):
+    ''' Cache COG headers and STAC item templates in a SQLite file keyed by
+    url. Entries are reread after maxAge, and optionally checked against the
+    file's ETag/Last-Modified before each use. Published COGs are rarely
+    replaced, so by default only maxAge bounds how stale an entry can be;
+    validate catches replaced files at the cost of a HEAD request per file.
+    '''
+
+    tables = {'headers': 'CREATE TABLE IF NOT EXISTS headers (key TEXT '
+              'PRIMARY KEY, content TEXT, validator TEXT, size INTEGER, '
+              'created REAL, accessed REAL)'}
+
+    def __init__(self, cacheFile='~/.grimp_cog_cache.sqlite', maxSize=100e6,
+                 maxAge=7 * 86400, validate=False):
+        '''
+        Parameters
+        ----------
+        cacheFile : str, optional
+            SQLite file for the cache. The default is
+            '~/.grimp_cog_cache.sqlite'.
+        maxSize : float, optional
+            Maximum size in bytes of the cached entries, least recently used
+            entries are removed above this. The default is 100e6.
+        maxAge : float, optional
+            Age in seconds after which entries are reread. The default is
+            7 * 86400 (a week).
+        validate : bool, optional
+            Check the ETag/Last-Modified (one HEAD request for urls) before
+            using a cached entry, and reread the header if it changed. The
+            default is False (no requests for cached entries).
+        Returns
+        -------
+        None.
+        '''
+        super().__init__(cacheFile)
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        self.validate = validate
+
+    def get(self, path, kind='header'):
+        ''' Return the cached entry (e.g., header or stac) for path or None
+        if not cached, older than maxAge, or changed '''
+        url = cogUrl(path)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT content, validator, created FROM headers '
+                'WHERE key = ?', (f'{kind}:{url}',)).fetchone()
+        if row is None or time.time() - row[2] > self.maxAge:
+            return None
+        if self.validate and row[1] is not None and \
+                fileValidator(url) != row[1]:
+            return None
+        with self._transaction() as connection:
+            connection.execute('UPDATE headers SET accessed = ? WHERE key = ?',
+                               (time.time(), f'{kind}:{url}'))
+        return json.loads(row[0])
+
+    def put(self, path, content, kind='header'):
+        ''' Save an entry (JSON serializable) for path '''
+        url = cogUrl(path)
+        # Only request validators if they will be checked
+        validator = fileValidator(url) if self.validate else None
+        content = json.dumps(content)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?)',
+                (f'{kind}:{url}', content, validator, len(content), now, now))
+            self._evict(connection, 'headers', self.maxSize, self.maxAge)
+
+    def header(self, path, gdalOptions=None, maxPerHost=None):
+        ''' Return the header for path, reading and caching it if needed
+        (see readHeader for the options) '''
+        header = self.get(path)
+        if header is None:
+            header = readHeader(path, gdalOptions=gdalOptions,
+                                maxPerHost=maxPerHost)
+            self.put(path, header)
+        return header
+
+
+class cogReader():
+    ''' Array-like (band, y, x) view of the first band of a COG, or of a
+    window of it, for dask.array.from_array. The shape and dtype come from a
+    cached header, and the file is only opened on the first chunk read by
+    each thread. The open dataset is then kept for that thread's later
+    chunks, since reopening a remote COG rereads its header. GDAL datasets
+    can't be shared between threads, and they are not pickled, so process
+    workers open their own.'''
+
+    def __init__(self, path, header, masked=False, gdalOptions=None,
+                 maxPerHost=None, window=None):
+        '''
+        Parameters
+        ----------
+        path : str
+            File name or GDAL path (e.g., /vsicurl/...).
+        header : dict
+            Header from readHeader or cogHeaderCache.header.
+        masked : bool, optional
+            Replace nodata with NaN. The default is False.
+        gdalOptions : dict, optional
+            GDAL configuration options for reads. The default is None.
+        maxPerHost : int, optional
+            Maximum concurrent reads from the same host. The default is None.
+        window : tuple, optional
+            (rowOff, colOff, height, width) of the part of the COG to view
+            (e.g., from bboxWindow). The default is None (all of it).
+        Returns
+        -------
+        None.
+        '''
+        self.path = path
+        self.gdalOptions = gdalOptions or {}
+        self.maxPerHost = maxPerHost
+        self.nodata = header['nodata']
+        self.masked = masked and self.nodata is not None
+        if window is None:
+            window = (0, 0, header['height'], header['width'])
+        self.window = tuple(window)
+        self.shape = (1, self.window[2], self.window[3])
+        self.ndim = 3
+        self.dtype = np.dtype(header['dtype'])
+        if self.masked:
+            self.dtype = np.result_type(self.dtype, np.float32)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        ''' Leave out the open datasets when pickled (e.g., for process
+        workers) '''
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _dataset(self):
+        ''' Return this thread's open dataset, opening it on first use '''
+        if getattr(self._local, 'dataset', None) is None:
+            self._local.dataset = rasterio.open(self.path)
+        return self._local.dataset
+
+    def chunks(self, chunkSize):
+        ''' Return (band, y, x) chunks with boundaries on multiples of
+        chunkSize in the full COG, so each chunk reads whole blocks when
+        chunkSize is a multiple of the block size '''
+        def axisChunks(offset, size):
+            edges = [0] + [x - offset for x in range(
+                (offset // chunkSize + 1) * chunkSize, offset + size,
+                chunkSize)] + [size]
+            return tuple(b - a for a, b in zip(edges[:-1], edges[1:]))
+        return ((1,), axisChunks(self.window[0], self.window[2]),
+                axisChunks(self.window[1], self.window[3]))
+
+    def __getitem__(self, key):
+        ''' Read the window for a (band, y, x) tuple of slices '''
+        bandSlice, ySlice, xSlice = key
+        window = Window.from_slices(ySlice, xSlice, height=self.shape[1],
+                                    width=self.shape[2])
+        window = Window(window.col_off + self.window[1],
+                        window.row_off + self.window[0],
+                        window.width, window.height)
+        with hostLimit(self.path, self.maxPerHost), \
+                rasterio.Env(**self.gdalOptions):
+            data = self._dataset().read(1, window=window)
+        if self.masked:
+            data = np.where(data == self.nodata, np.nan, data)
+        return data.astype(self.dtype, copy=False)[np.newaxis][bandSlice]
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local spatio-temporal index of CMR granules, so searches inside an area and
+date range that has already been searched can be answered without CMR.
+
+@author: ian
+"""
+import re
+import time
+from fnmatch import fnmatchcase
+from grimpfunc.sqliteStore import sqliteStore
+
+globalBounds = (-180., -90., 180., 90.)
+# Band/type token in GrIMP file names (e.g., ..._vv_v05.0.tif)
+bandPattern = re.compile(
+    r'_(vv|vx|vy|ex|ey|dT|browse|image|gamma0|sigma0|termini)[_.]')
+
+
+def _isoTime(timeStr):
+    ''' Truncate CMR times to YYYY-MM-DDTHH:MM:SS so they compare as
+    strings '''
+    return timeStr.rstrip('Z')[:19] if timeStr else ''
+
+
+def _parseBoundingBox(bounding_box):
+    ''' Convert "lonmin,latmin,lonmax,latmax" to a tuple, None is global '''
+    if not bounding_box:
+        return globalBounds
+    return tuple(float(x) for x in bounding_box.split(','))
+
+
+def entryBounds(entry):
+    ''' Return (lonmin, latmin, lonmax, latmax) for a CMR granule entry from
+    its boxes ("S W N E") or polygons ("lat lon lat lon ...") '''
+    lats, lons = [], []
+    for box in entry.get('boxes', []):
+        south, west, north, east = [float(x) for x in box.split()]
+        lats += [south, north]
+        lons += [west, east]
+    for polygon in entry.get('polygons', []):
+        for ring in polygon:
+            values = [float(x) for x in ring.split()]
+            lats += values[0::2]
+            lons += values[1::2]
+    if not lats:
+        return globalBounds
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def fileBand(url):
+    ''' Return the band/type (e.g., vv) from a GrIMP file name or '' '''
+    match = bandPattern.search(url.split('/')[-1])
+    return match.group(1) if match else ''
+
+
+class granuleIndex(sqliteStore):
+    ''' SQLite index (with an R-tree on footprints) of granule urls with
+    product, version, time range, footprint, and band. Each search added is
+    recorded as covered along with the granules it returned, so later
+    searches that fall inside a covered area and time range are answered
+    from the granules of the newest covering search.'''
+
+    # Increment when the tables change to discard older indexes, since
+    # coverage without granule membership can't be used
+    schemaVersion = 2
+    tables = {'granules': 'CREATE TABLE IF NOT EXISTS granules (id INTEGER '
+              'PRIMARY KEY, endpoint TEXT, short_name TEXT, version TEXT, '
+              'granule_id TEXT, time_start TEXT, time_end TEXT, band TEXT, '
+              'url TEXT UNIQUE)',
+              'footprints': 'CREATE VIRTUAL TABLE IF NOT EXISTS footprints '
+              'USING rtree(id, minLon, maxLon, minLat, maxLat)',
+              'coverage': 'CREATE TABLE IF NOT EXISTS coverage (id INTEGER '
+              'PRIMARY KEY, endpoint TEXT, short_name TEXT, version TEXT, '
+              'filename_filter TEXT, time_start TEXT, time_end TEXT, '
+              'minLon REAL, minLat REAL, maxLon REAL, maxLat REAL, '
+              'created REAL)',
+              'coverageGranules': 'CREATE TABLE IF NOT EXISTS '
+              'coverageGranules (coverage INTEGER, granule INTEGER, '
+              'PRIMARY KEY (coverage, granule))'}
+    indexes = ['CREATE INDEX IF NOT EXISTS granules_product ON granules '
+               '(short_name, version, time_start)']
+
+    def __init__(self, indexFile='~/.grimp_granule_index.sqlite',
+                 maxAge=3600):
+        '''
+        Parameters
+        ----------
+        indexFile : str, optional
+            SQLite file for the index. The default is
+            '~/.grimp_granule_index.sqlite'.
+        maxAge : float, optional
+            Age in seconds after which a covered search must be repeated at
+            CMR. The default is 3600.
+        Returns
+        -------
+        None.
+        '''
+        super().__init__(indexFile)
+        self.maxAge = maxAge
+
+    def add(self, short_name, version, time_start, time_end, bounding_box,
+            filename_filter, entryUrls, endpoint=''):
+        '''
+        Add the results of a complete CMR search and mark it as covered.
+        Granules only returned by expired searches (e.g., removed or
+        reprocessed at CMR) are removed.
+
+        Parameters
+        ----------
+        short_name, version, time_start, time_end, bounding_box,
+        filename_filter : str
+            The search parameters (as for get_urls).
+        entryUrls : list
+            (entry, url) pairs from cmr_filter_entries.
+        endpoint : str, optional
+            CMR host that answered the search (cmr.cmr_endpoint()), only
+            searches of the same CMR are used. The default is ''.
+        Returns
+        -------
+        None.
+        '''
+        version = str(version)
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                'INSERT INTO coverage (endpoint, short_name, version, '
+                'filename_filter, time_start, time_end, minLon, minLat, '
+                'maxLon, maxLat, created) VALUES '
+                '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (endpoint, short_name, version, filename_filter or '*',
+                 _isoTime(time_start), _isoTime(time_end),
+                 *_parseBoundingBox(bounding_box), time.time()))
+            coverageID = cursor.lastrowid
+            for entry, url in entryUrls:
+                timeStart = _isoTime(entry.get('time_start'))
+                values = (endpoint, short_name, version,
+                          entry.get('producer_granule_id',
+                                    url.split('/')[-1]),
+                          timeStart,
+                          _isoTime(entry.get('time_end')) or timeStart,
+                          fileBand(url))
+                row = connection.execute(
+                    'SELECT id FROM granules WHERE url = ?', (url,)).fetchone()
+                # Update existing urls in case the metadata changed
+                if row is None:
+                    granuleID = connection.execute(
+                        'INSERT INTO granules (endpoint, short_name, '
+                        'version, granule_id, time_start, time_end, band, '
+                        'url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (*values, url)).lastrowid
+                else:
+                    granuleID = row[0]
+                    connection.execute(
+                        'UPDATE granules SET endpoint = ?, short_name = ?, '
+                        'version = ?, '
+                        'granule_id = ?, time_start = ?, time_end = ?, '
+                        'band = ? WHERE id = ?', (*values, granuleID))
+                lonMin, latMin, lonMax, latMax = entryBounds(entry)
+                connection.execute(
+                    'INSERT OR REPLACE INTO footprints VALUES (?, ?, ?, ?, ?)',
+                    (granuleID, lonMin, lonMax, latMin, latMax))
+                connection.execute(
+                    'INSERT OR IGNORE INTO coverageGranules VALUES (?, ?)',
+                    (coverageID, granuleID))
+            self._prune(connection)
+
+    def _prune(self, connection):
+        ''' Remove expired searches and granules no search returned '''
+        expired = [x[0] for x in connection.execute(
+            'SELECT id FROM coverage WHERE created < ?',
+            (time.time() - self.maxAge,))]
+        connection.executemany('DELETE FROM coverageGranules WHERE '
+                               'coverage = ?', [(x,) for x in expired])
+        connection.executemany('DELETE FROM coverage WHERE id = ?',
+                               [(x,) for x in expired])
+        connection.execute('DELETE FROM granules WHERE id NOT IN '
+                           '(SELECT granule FROM coverageGranules)')
+        connection.execute('DELETE FROM footprints WHERE id NOT IN '
+                           '(SELECT id FROM granules)')
+
+    def _coveringSearch(self, connection, short_name, version, time_start,
+                        time_end, bounding_box, filename_filter, endpoint):
+        ''' Return the id of the newest search of endpoint within maxAge that
+        covers this one or None '''
+        lonMin, latMin, lonMax, latMax = _parseBoundingBox(bounding_box)
+        row = connection.execute(
+            'SELECT id FROM coverage WHERE endpoint = ? AND '
+            'short_name = ? AND version = ? '
+            'AND filename_filter IN (?, \'*\') AND time_start <= ? AND '
+            'time_end >= ? AND minLon <= ? AND minLat <= ? AND '
+            'maxLon >= ? AND maxLat >= ? AND created >= ? '
+            'ORDER BY created DESC LIMIT 1',
+            (endpoint, short_name, str(version), filename_filter or '*',
+             _isoTime(time_start), _isoTime(time_end), lonMin, latMin,
+             lonMax, latMax, time.time() - self.maxAge)).fetchone()
+        return None if row is None else row[0]
+
+    def covered(self, short_name, version, time_start, time_end,
+                bounding_box, filename_filter, endpoint=''):
+        ''' Return True if a search of endpoint inside this area and time
+        range with the same or a wildcard filter has been added within
+        maxAge '''
+        with self._transaction() as connection:
+            return self._coveringSearch(
+                connection, short_name, version, time_start, time_end,
+                bounding_box, filename_filter, endpoint) is not None
+
+    def search(self, short_name, version, time_start, time_end, bounding_box,
+               filename_filter, band=None, endpoint=''):
+        '''
+        Return the urls for a search from the granules of the newest covering
+        search, sorted by start date and granule id as for CMR, or None if
+        the search is not covered. Areas are compared using footprint
+        bounding boxes.
+
+        Parameters
+        ----------
+        short_name, version, time_start, time_end, bounding_box,
+        filename_filter : str
+            The search parameters (as for get_urls).
+        band : str, optional
+            Only return this band (e.g., vv). The default is None.
+        endpoint : str, optional
+            CMR host (cmr.cmr_endpoint()) whose searches are used. The
+            default is ''.
+        Returns
+        -------
+        urls : list of str or None
+        '''
+        lonMin, latMin, lonMax, latMax = _parseBoundingBox(bounding_box)
+        query = ('SELECT g.granule_id, g.url FROM granules g JOIN footprints f '
+                 'ON g.id = f.id JOIN coverageGranules c ON g.id = c.granule '
+                 'WHERE c.coverage = ? AND g.endpoint = ? AND '
+                 'g.time_start <= ? AND g.time_end >= ? AND f.maxLon >= ? '
+                 'AND f.minLon <= ? AND f.maxLat >= ? AND f.minLat <= ?')
+        params = [endpoint, _isoTime(time_end), _isoTime(time_start), lonMin,
+                  lonMax, latMin, latMax]
+        if band is not None:
+            query += ' AND g.band = ?'
+            params.append(band)
+        with self._transaction() as connection:
+            coverageID = self._coveringSearch(
+                connection, short_name, version, time_start, time_end,
+                bounding_box, filename_filter, endpoint)
+            if coverageID is None:
+                return None
+            rows = connection.execute(
+                query + ' ORDER BY g.time_start, g.granule_id',
+                [coverageID] + params).fetchall()
+        return [url for granuleID, url in rows
+                if not filename_filter or
+                fnmatchcase(granuleID, filename_filter)]
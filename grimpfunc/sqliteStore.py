@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Base class for the SQLite caches and indexes.
+
+@author: ian
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+
+class sqliteStore():
+    ''' SQLite file shared by threads through a lock, with the tables created
+    on first use. Subclasses set tables and, if needed, indexes and
+    schemaVersion. '''
+
+    # CREATE statement for each table by name
+    tables = {}
+    # Other statements run with the CREATEs (e.g., CREATE INDEX)
+    indexes = []
+    # Increment when the tables change to discard older files (0 keeps them)
+    schemaVersion = 0
+
+    def __init__(self, storeFile):
+        '''
+        Parameters
+        ----------
+        storeFile : str
+            SQLite file, ~ is expanded.
+        Returns
+        -------
+        None.
+        '''
+        self.storeFile = os.path.expanduser(storeFile)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        ''' Open the file, creating the tables on first use '''
+        connection = sqlite3.connect(self.storeFile, timeout=30)
+        if not self._initialized:
+            try:
+                with connection:
+                    self._createTables(connection)
+            except BaseException:
+                connection.close()
+                raise
+            self._initialized = True
+        return connection
+
+    def _createTables(self, connection):
+        ''' Create the tables, dropping them first if the file is from an
+        older schemaVersion '''
+        if self.schemaVersion and connection.execute(
+                'PRAGMA user_version').fetchone()[0] < self.schemaVersion:
+            for table in self.tables:
+                connection.execute(f'DROP TABLE IF EXISTS {table}')
+            connection.execute(f'PRAGMA user_version = {self.schemaVersion}')
+        for statement in list(self.tables.values()) + self.indexes:
+            connection.execute(statement)
+
+    @contextmanager
+    def _transaction(self):
+        ''' Hold the lock and yield a connection that is committed (or rolled
+        back on an error) and closed on exit '''
+        with self._lock, closing(self._connect()) as connection, connection:
+            yield connection
+
+    def _evict(self, connection, table, maxSize, maxAge):
+        ''' Remove entries of table created more than maxAge seconds ago, then
+        least recently used entries until the total size is below maxSize.
+        The table needs key, size, created and accessed columns. '''
+        connection.execute(f'DELETE FROM {table} WHERE created < ?',
+                           (time.time() - maxAge,))
+        total = connection.execute(
+            f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+        if total <= maxSize:
+            return
+        for key, size in connection.execute(
+                f'SELECT key, size FROM {table} ORDER BY accessed').fetchall():
+            connection.execute(f'DELETE FROM {table} WHERE key = ?', (key,))
+            total -= size
+            if total <= maxSize:
+                break
+
+    def clear(self):
+        ''' Remove all entries '''
+        with self._transaction() as connection:
+            for table in self.tables:
+                connection.execute(f'DELETE FROM {table}')
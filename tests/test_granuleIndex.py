@@ -0,0 +1,44 @@
+import sqlite3
+from grimpfunc.granuleIndex import granuleIndex
+
+
+def entry(url, timeStart='2020-01-01T00:00:00Z'):
+    ''' Minimal CMR entry for a url '''
+    return ({'producer_granule_id': url.split('/')[-1],
+             'time_start': timeStart, 'time_end': timeStart,
+             'boxes': ['60 -50 80 -20']}, url)
+
+
+def search(index):
+    return index.search('NSIDC-0725', '5', '2019-01-01T00:00:00Z',
+                        '2021-01-01T00:00:00Z', None, None)
+
+
+def add(index, urls):
+    index.add('NSIDC-0725', '5', '2019-01-01T00:00:00Z',
+              '2021-01-01T00:00:00Z', None, None, [entry(x) for x in urls])
+
+
+def test_readd_after_expiry_drops_superseded(tmp_path):
+    index = granuleIndex(str(tmp_path / 'index.sqlite'))
+    add(index, ['u/A.tif', 'u/B_old.tif'])
+    assert search(index) == ['u/A.tif', 'u/B_old.tif']
+    # Expire the first search
+    with sqlite3.connect(index.storeFile) as connection:
+        connection.execute('UPDATE coverage SET created = 0')
+    assert search(index) is None
+    add(index, ['u/A.tif', 'u/B_new.tif'])
+    assert search(index) == ['u/A.tif', 'u/B_new.tif']
+
+
+def test_search_only_uses_same_endpoint(tmp_path):
+    index = granuleIndex(str(tmp_path / 'index.sqlite'))
+    index.add('NSIDC-0725', '5', '2019-01-01T00:00:00Z',
+              '2021-01-01T00:00:00Z', None, None, [entry('u/A.tif')],
+              endpoint='data.standin.local')
+    assert index.search('NSIDC-0725', '5', '2019-01-01T00:00:00Z',
+                        '2021-01-01T00:00:00Z', None, None,
+                        endpoint='cmr.earthdata.nasa.gov') is None
+    assert index.search('NSIDC-0725', '5', '2019-01-01T00:00:00Z',
+                        '2021-01-01T00:00:00Z', None, None,
+                        endpoint='data.standin.local') == ['u/A.tif']